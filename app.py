@@ -1,14 +1,6 @@
 # ---------- SETUP ----------
-import os, logging, sys
-from datetime import date
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-LOG_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, f"logs/{date.today()}.log"))
-logging.basicConfig(
-  level=logging.INFO,
-  format="[ %(asctime)s ] - %(thread)d - %(filename)s - %(funcName)s - [ %(levelname)s ] - %(message)s",
-  datefmt="%Y-%m-%d %H:%M:%S",
-  filename=LOG_DIR
-)
+from monitoring.logger import setup_logging
+setup_logging()
 
 # ---------- IMPORTS ----------
 
@@ -20,6 +12,7 @@ from dash import html, dcc, Input, Output, State, ALL, MATCH, ctx
 from components.header import get_header
 from components.footer import get_footer
 from callback import CallbackManager
+from monitoring.metrics import init_metrics
 
 app = dash.Dash(__name__, use_pages=True, external_stylesheets=[dbc.themes.BOOTSTRAP, dbc.icons.FONT_AWESOME])
 server = app.server
@@ -32,6 +25,7 @@ app.layout = html.Div(id="main-body", children=[
 
 cbm = CallbackManager(app)
 cbm.init_callbacks()
+init_metrics(app)
 
 if __name__ == "__main__":
   app.run(host="0.0.0.0", debug=True)
\ No newline at end of file
@@ -0,0 +1,114 @@
+// Clientside counterpart of TotalSalesCountGraph.handle_data_process, used when the app runs with clientside_graphs enabled.
+// The server sends the daily quantities of every group once, windowing, rebasing, resampling and downsampling happen here.
+(function registerClientsideGraphs() {
+  const DAY = 86400000;
+  const toDay = (date) => Math.floor(Date.parse(String(date).slice(0, 10) + "T00:00:00Z") / DAY);
+  const toDate = (day) => new Date(day * DAY).toISOString().slice(0, 10);
+
+  // Period keys matching pandas' "W" (weeks ending on Sunday) and "M" aliases, day 0 being Thursday 1970-01-01
+  const PERIODS = {
+    D: (day) => day,
+    W: (day) => Math.floor((day - 4) / 7),
+    M: (day) => { const date = new Date(day * DAY); return date.getUTCFullYear() * 12 + date.getUTCMonth(); },
+  };
+  const RESOLUTIONS = { D: 1, W: 7, M: 31 };
+
+  function getResolution(days, traceBudget) {
+    for (const [resolution, periodDays] of Object.entries(RESOLUTIONS)) {
+      if (days / periodDays <= traceBudget) return resolution;
+    }
+    return "M";
+  }
+
+  // Indexes of the last day of every period of the window
+  function getPeriodEnds(startDay, days, resolution) {
+    const period = PERIODS[resolution];
+    const ends = [];
+    for (let i = 0; i < days; i++) {
+      if (i === days - 1 || period(startDay + i) !== period(startDay + i + 1)) ends.push(i);
+    }
+    return ends;
+  }
+
+  // Largest-Triangle-Three-Buckets, same as dataProcessor/downsampling.py
+  function lttb(x, y, threshold) {
+    const n = x.length;
+    if (threshold >= n || threshold < 3) return x.map((_, i) => i);
+    const edges = Array.from({ length: threshold - 1 }, (_, i) => Math.floor(1 + (i * (n - 2)) / (threshold - 2)));
+    const indices = [0];
+    let previous = 0;
+    for (let i = 0; i < threshold - 2; i++) {
+      const start = edges[i], end = Math.max(edges[i + 1], edges[i] + 1);
+      const nextStart = edges[i + 1];
+      const nextEnd = Math.max(i + 2 < edges.length ? edges[i + 2] : n, nextStart + 1);
+      let nextX = 0, nextY = 0;
+      for (let j = nextStart; j < nextEnd; j++) { nextX += x[j]; nextY += y[j]; }
+      nextX /= nextEnd - nextStart; nextY /= nextEnd - nextStart;
+      let best = start, bestArea = -1;
+      for (let j = start; j < end; j++) {
+        const area = Math.abs((x[previous] - nextX) * (y[j] - y[previous]) - (x[previous] - x[j]) * (nextY - y[previous]));
+        if (area > bestArea) { best = j; bestArea = area; }
+      }
+      indices.push(best);
+      previous = best;
+    }
+    indices.push(n - 1);
+    return indices;
+  }
+
+  function totalSalesCount(data, groupby, dateIndexes, dates) {
+    if (!data || !dates || !dateIndexes) return window.dash_clientside.no_update;
+    const key = groupby === null || groupby === undefined ? "None" : groupby;
+    const series = data.series[key];
+    if (!series) return window.dash_clientside.no_update;
+
+    const timeFrame = dates.slice(dateIndexes[0], dateIndexes[1]);
+    if (timeFrame.length === 0) return window.dash_clientside.no_update;
+    const startDay = toDay(timeFrame[0]);
+    const days = toDay(timeFrame[timeFrame.length - 1]) - startDay + 1;
+    const seriesStart = series.start === null ? null : toDay(series.start);
+
+    const traceBudget = Math.max(data.minPointsPerTrace, Math.floor(data.pointBudget / Math.max(series.groups.length, 1)));
+    const ends = getPeriodEnds(startDay, days, getResolution(days, traceBudget));
+    const x = ends.map((end) => startDay + end);
+
+    const traces = series.groups.map((group, index) => {
+      // Cumulative quantities are rebased at the window start, days outside of the series count as zero
+      const daily = series.daily[index];
+      const cumulative = new Array(days);
+      let total = 0;
+      for (let i = 0; i < days; i++) {
+        const position = seriesStart === null ? -1 : startDay + i - seriesStart;
+        total += position >= 0 && position < daily.length ? daily[position] : 0;
+        cumulative[i] = total;
+      }
+      const y = ends.map((end) => cumulative[end]);
+      const kept = lttb(x, y, traceBudget);
+      return { name: group, x: kept.map((i) => toDate(x[i])), y: kept.map((i) => y[i]) };
+    });
+
+    const colorColumn = data.colorColumns[key];
+    const points = traces.reduce((sum, trace) => sum + trace.x.length, 0);
+    const layout = JSON.parse(JSON.stringify(data.layout));
+    if (colorColumn) {
+      layout.legend = Object.assign({}, layout.legend, { title: { text: colorColumn }, tracegroupgap: 0 });
+    }
+    return {
+      data: traces.map((trace) => ({
+        type: points > data.webglThreshold ? "scattergl" : "scatter",
+        mode: "lines",
+        name: colorColumn ? trace.name : "",
+        legendgroup: colorColumn ? trace.name : "",
+        showlegend: Boolean(colorColumn),
+        hovertemplate: (colorColumn ? `${colorColumn}=${trace.name}<br>` : "") + "PostedDate=%{x}<br>QuantityShippedTrueCumulative=%{y}<extra></extra>",
+        x: trace.x,
+        y: trace.y,
+      })),
+      layout: layout,
+    };
+  }
+
+  window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    graphs: { totalSalesCount: totalSalesCount },
+  });
+})();
@@ -0,0 +1,102 @@
+# ---------- SETUP ----------
+import os, sys
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(SCRIPT_DIR, "..")))
+
+# ---------- IMPORTS ----------
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from dataProcessor.graphFactory import TotalSalesCountGraph
+
+class LegacyTotalSalesCountGraph:
+  """Row-wise pipeline TotalSalesCountGraph used before the vectorized rewrite, kept only for comparison."""
+  def __init__(self, dataframe: pd.DataFrame) -> None:
+    self.df = dataframe
+    self.dfs = []
+
+  def handle_data_process(self, marketplaces: list[str], variants: list[str], groupby: str|None, time_frame: list[str]) -> None:
+    self.df = self.df[self.df["MarketplaceName"].isin(marketplaces)]
+    variant_columns = [column for column in self.df.columns if "Variant." in column]
+    for col in variant_columns:
+      self.df = self.df[self.df[col].isin(variants)]
+    self.df["QuantityShippedTrue"] = self.df.apply(lambda row: row["QuantityShipped"] if row["ShipmentType"] == "Order" else -row["QuantityShipped"], axis=1)
+    self.df["PostedDate"] = pd.to_datetime(self.df["PostedDate"].str.split("T", expand=True)[0])
+    self.df = self.df[(self.df["PostedDate"] >= time_frame[0]) & (self.df["PostedDate"] <= time_frame[-1])].reset_index(drop=True)
+    if groupby is None:
+      self.dfs = [self.df.copy().groupby(by="PostedDate").agg("sum", numeric_only=True).reset_index()]
+    elif groupby == "Marketplace":
+      for marketplace in marketplaces:
+        df_ = self.df[self.df["MarketplaceName"] == marketplace].copy()
+        df_ = df_.groupby(by="PostedDate").agg("sum", numeric_only=True).reset_index()
+        df_["MarketplaceName"] = marketplace
+        self.dfs.append(df_)
+    elif groupby == "Variant":
+      self.df["Variant.All"] = self.df[variant_columns].agg(" - ".join, axis=1)
+      for variant in variants:
+        df_ = self.df[self.df["Variant.All"] == variant].copy()
+        df_ = df_.groupby(by="PostedDate").agg("sum", numeric_only=True).reset_index()
+        df_["Variant.All"] = variant
+        self.dfs.append(df_)
+    self.dfs = list(map(self.fill_spaces_between_dates, self.dfs))
+    for df_ in self.dfs:
+      df_["QuantityShippedTrueCumulative"] = df_["QuantityShippedTrue"].cumsum()
+    self.df = pd.concat(self.dfs)
+
+  @staticmethod
+  def fill_spaces_between_dates(dataframe: pd.DataFrame) -> pd.DataFrame:
+    if dataframe.empty:
+      return dataframe
+    all_dates = pd.DataFrame(pd.date_range(dataframe["PostedDate"].min(), dataframe["PostedDate"].max()), columns=["PostedDate"])
+    all_dates_df = all_dates.merge(right=dataframe, how="left", on="PostedDate")
+    all_dates_df[["QuantityShipped", "QuantityShippedTrue"]] = all_dates_df[["QuantityShipped", "QuantityShippedTrue"]].fillna(0.0).astype(int)
+    return all_dates_df
+
+def make_events(rows: int, variants: int, days: int, seed: int=0) -> pd.DataFrame:
+  """Synthetic sales events shaped like the rows returned by Puller.get_product_sales."""
+  rng = np.random.default_rng(seed)
+  start = pd.Timestamp("2021-01-01")
+  posted = start + pd.to_timedelta(rng.integers(0, days, rows), unit="D") + pd.to_timedelta(rng.integers(0, 86400, rows), unit="s")
+  return pd.DataFrame({
+    "Order_id": [f"{i:03d}-0000000-0000000" for i in range(rows)],
+    "MarketplaceName": rng.choice(["Amazon.com", "Amazon.ca"], rows),
+    "PostedDate": posted.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    "SKU": rng.choice([f"SKU-{i}" for i in range(variants)], rows),
+    "Variant.Color": rng.choice([f"Color {i}" for i in range(variants)], rows),
+    "ShipmentType": rng.choice(["Order", "Refund"], rows, p=[0.95, 0.05]),
+    "QuantityShipped": rng.integers(1, 4, rows),
+  })
+
+def timeit(function, repeat: int) -> float:
+  best = float("inf")
+  for _ in range(repeat):
+    start = time.perf_counter()
+    function()
+    best = min(best, time.perf_counter() - start)
+  return best
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Compares the legacy and vectorized TotalSalesCountGraph pipelines.")
+  parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+  parser.add_argument("--variants", type=int, default=12)
+  parser.add_argument("--days", type=int, default=730)
+  parser.add_argument("--repeat", type=int, default=3)
+  parser.add_argument("--skip-legacy-above", type=int, default=100_000, help="Row count above which the legacy path is not timed")
+  args = parser.parse_args()
+
+  print(f"{'rows':>10} {'groupby':>12} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+  for rows in args.rows:
+    events = make_events(rows, args.variants, args.days)
+    marketplaces = sorted(events["MarketplaceName"].unique())
+    variants = sorted(events["Variant.Color"].unique())
+    time_frame = [str(date.date()) for date in pd.date_range("2021-01-01", periods=args.days)]
+    for groupby in (None, "Marketplace", "Variant"):
+      run = lambda graph: lambda: graph(events.copy()).handle_data_process(marketplaces, variants, groupby, time_frame)
+      new = timeit(run(TotalSalesCountGraph), args.repeat)
+      if rows <= args.skip_legacy_above:
+        old = timeit(run(LegacyTotalSalesCountGraph), args.repeat)
+        print(f"{rows:>10} {str(groupby):>12} {old:>12.3f} {new:>15.3f} {old / new:>8.1f}x")
+      else:
+        print(f"{rows:>10} {str(groupby):>12} {'-':>12} {new:>15.3f} {'-':>9}")
@@ -1,13 +1,21 @@
+import os
 import dash
 import json
 import pandas as pd
-from dash import Input, Output, State, ALL, MATCH, ctx
+from dash import Input, Output, State, ALL, MATCH, ctx, html, Patch, ClientsideFunction
+from dash.exceptions import PreventUpdate
 from typing import Any
 from enum import Enum, StrEnum
-from collections import defaultdict
 
 from database.dBManager import DBManager
-from dataProcessor.graphFactory import GraphFactory
+from dataProcessor.graphFactory import GraphFactory, TotalSalesCountGraph
+from dataProcessor.datasetStore import DatasetStore
+from monitoring.logReader import LogReader, LogIndex, LogRecord
+
+# Graphs are drawn by assets/scripts/clientside.js from series sent once per filter change, instead of on every slider move
+CLIENTSIDE_GRAPHS = os.environ.get("clientside_graphs", "false").lower() in ("1", "true")
+# Log records shown per page of the log page
+LOG_PAGE_SIZE = 200
 
 class FilterState(Enum):
   VISIBLE = {
@@ -25,24 +33,41 @@ Marketplace = {
 }
 
 class CallbackManager():
-  __slots__ = "app", "db"
-  def __init__(self, app: dash.Dash) -> None:
+  __slots__ = "app", "db", "datasets", "logs", "clientside"
+  def __init__(self, app: dash.Dash, clientside: bool|None=None) -> None:
     self.app = app
+    self.logs = LogReader()
+    self.clientside = CLIENTSIDE_GRAPHS if clientside is None else clientside
     self.db = DBManager()
+    self.datasets = DatasetStore(self.db)
   
   def init_callbacks(self) -> None:
     self.refresh_product_filter()
     self.get_product_sales()
     self.update_product_filters_options()
-    self.update_graphs()
+    if self.clientside:
+      self.update_graph_series()
+      self.update_graphs_clientside()
+    else:
+      self.update_graphs()
+    self.update_log_files()
+    self.toggle_log_tail()
+    self.update_log_page()
   
   def refresh_product_filter(self) -> None:
     @self.app.callback(
       Output({"type": "product-filter", "uuid": ALL}, "options"),
-      Input("refresh-dropdown-options", "n_intervals")
+      Output("product-options-version", "data"),
+      Input("refresh-dropdown-options", "n_intervals"),
+      State("product-options-version", "data")
     )
-    def callback(interval):
-      return [self.db.puller.get_product_options() for _ in range(len(ctx.outputs_list))]
+    def callback(interval, version):
+      # Most writes touch other collections than Products, so options are only sent when their hash changes.
+      # Options and their hash are cached per data version, an unchanged tick costs a cache lookup only
+      options, options_hash = self.db.puller.get_product_options()
+      if options_hash == version:
+        raise PreventUpdate
+      return [options for _ in range(len(ctx.outputs_list[0]))], options_hash
   
   def get_product_sales(self) -> None:
     @self.app.callback(
@@ -51,7 +76,8 @@ class CallbackManager():
       prevent_initial_call=True
     )
     def callback(SKUs: str):
-      return self.db.puller.get_product_sales(json.loads(SKUs))
+      # Only a handle is sent to the browser, the rows stay in the server side dataset store
+      return self.datasets.put(ctx.triggered_id["uuid"], json.loads(SKUs))
   
   def update_product_filters_options(self) -> None:
     @self.app.callback(
@@ -68,31 +94,23 @@ class CallbackManager():
       Input({"type": "graph-data-storage", "uuid": MATCH}, "data"),
       prevent_initial_call=True
     )
-    def callback(data: list[dict[str, str]]):
-      unique_dict = self._get_unique_values_in_dict(data)
-      marketplaces = unique_dict["MarketplaceName"]
-      variant_categories = [value for key, value in unique_dict.items() if "Variant." in key]
-      marketplace_options = [{"label": Marketplace[marketplace], "value": marketplace} for marketplace in marketplaces if marketplace is not None]
-      variant_options = [{"label": variant, "value": variant} for category in variant_categories for variant in category if variant is not None]
+    def callback(handle: dict[str, Any]):
+      # Facets are computed with the dataset, populating the filters does not scan its rows
+      facets = self.datasets.get_facets(handle)
+      if facets.first_date is None:
+        raise PreventUpdate
+      marketplace_options = [{"label": Marketplace[marketplace], "value": marketplace} for marketplace in facets.marketplaces]
+      variant_options = [{"label": variant, "value": variant} for values in facets.variants.values() for variant in values]
       groupby_options = [{"label": "None", "value": None}, {"label": "Marketplace", "value": "Marketplace", "disabled": True}, {"label": "Variant", "value": "Variant", "disabled": True}]
       if len(marketplace_options) >= 2:
         groupby_options[1] = {"label": "Marketplace", "value": "Marketplace"}
       if len(variant_options) >= 2:
         groupby_options[2] = {"label": "Variant", "value": "Variant"}
       get_values = lambda option_list: [option["value"] for option in option_list]
-      dates = pd.to_datetime(pd.Series(map(lambda x: x.split("T")[0], unique_dict["PostedDate"])))
-      dates = pd.date_range(dates.min(), dates.max(), name="PostedDate")
+      dates = pd.date_range(facets.first_date.normalize(), facets.last_date.normalize(), name="PostedDate") # type: ignore
       marks = {index[0]: date.strftime("%B %Y") for index, date, condition in zip(enumerate(dates), dates, dates.is_month_start) if condition}
       return marketplace_options, variant_options, groupby_options, get_values(marketplace_options), get_values(variant_options), None, len(dates), (0, len(dates)), marks, dates.to_list()
   
-  @staticmethod
-  def _get_unique_values_in_dict(dict_list: list[dict[Any, Any]]) -> defaultdict[Any, set[Any]]:
-    unique_dict = defaultdict(set)
-    for dict_ in dict_list:
-      for key, value in dict_.items():
-        unique_dict[key].add(value)
-    return unique_dict
-  
   def update_graphs(self) -> None:
     @self.app.callback(
       Output({"type": "main-graph", "uuid": MATCH}, "figure"),
@@ -105,14 +123,162 @@ class CallbackManager():
       State({"type": "graph-time-frame-data-storage", "uuid": MATCH}, "data"),
       prevent_initial_call=True
     )
-    def callback(data: list[dict[str, Any]], button_click: int, marketplaces: list[str], variants: list[str], groupby: str|None, date_indexes: tuple[int, int], dates: list[str]):
-      dataframe = pd.DataFrame(data)
+    def callback(handle: dict[str, Any], button_click: int, marketplaces: list[str], variants: list[str], groupby: str|None, date_indexes: tuple[int, int], dates: list[str]):
+      # Slider moves only slice the memoized series of the filters, the dataset itself is not reprocessed
+      series = self.datasets.get_series(handle, marketplaces, variants, groupby)
       graph = GraphFactory().get_graph(
         type_="total_sales_count",
-        dataframe=dataframe,
+        dataframe=None,
         marketplaces=marketplaces,
         variants=variants,
         groupby=groupby,
-        time_frame=dates[date_indexes[0]:date_indexes[1]]
+        time_frame=dates[date_indexes[0]:date_indexes[1]],
+        series=series
       )
-      return graph
\ No newline at end of file
+      return graph
+  
+  def update_graph_series(self) -> None:
+    @self.app.callback(
+      Output({"type": "graph-series-storage", "uuid": MATCH}, "data"),
+      Input({"type": "filter-apply-button", "uuid": MATCH}, "n_clicks"),
+      Input({"type": "graph-time-frame-data-storage", "uuid": MATCH}, "data"),
+      State({"type": "graph-data-storage", "uuid": MATCH}, "data"),
+      State({"type": "marketplace-filter", "uuid": MATCH}, "value"),
+      State({"type": "variant-filter", "uuid": MATCH}, "value"),
+      prevent_initial_call=True
+    )
+    def callback(button_click: int, dates: list[str], handle: dict[str, Any], marketplaces: list[str], variants: list[str]):
+      # The series of every groupby are sent at once, so that groupby changes never reach the server
+      if handle is None:
+        raise PreventUpdate
+      series = {groupby: self.datasets.get_series(handle, marketplaces, variants, groupby) for groupby in (None, "Marketplace", "Variant")}
+      return TotalSalesCountGraph.get_clientside_data(series)
+  
+  def update_graphs_clientside(self) -> None:
+    self.app.clientside_callback(
+      ClientsideFunction(namespace="graphs", function_name="totalSalesCount"),
+      Output({"type": "main-graph", "uuid": MATCH}, "figure"),
+      Input({"type": "graph-series-storage", "uuid": MATCH}, "data"),
+      Input({"type": "groupby-filter", "uuid": MATCH}, "value"),
+      Input({"type": "date-filter", "uuid": MATCH}, "value"),
+      State({"type": "graph-time-frame-data-storage", "uuid": MATCH}, "data"),
+      prevent_initial_call=True
+    )
+  
+  def update_log_files(self) -> None:
+    @self.app.callback(
+      Output("log-file", "options"),
+      Output("log-file", "value"),
+      Input("log-files-refresh", "n_intervals"),
+      State("log-file", "value")
+    )
+    def callback(interval: int, selected: str|None):
+      files = self.logs.files()
+      options = [{"label": f"{file['name']} ({int(file['size']) / 2**20:.1f} MB)", "value": file["name"]} for file in files]
+      # Setting the value again would reload the page shown, it is only set on the first refresh
+      if selected is not None:
+        return options, dash.no_update
+      return options, files[0]["name"] if files else None
+  
+  def toggle_log_tail(self) -> None:
+    @self.app.callback(
+      Output("log-tail", "disabled"),
+      Input("log-live", "value")
+    )
+    def callback(live: bool):
+      return not live
+  
+  def update_log_page(self) -> None:
+    @self.app.callback(
+      Output("log-records", "children"),
+      Output("log-page", "data"),
+      Input("log-file", "value"),
+      Input("log-levels", "value"),
+      Input("log-search", "value"),
+      Input("log-older", "n_clicks"),
+      Input("log-newer", "n_clicks"),
+      Input("log-tail", "n_intervals"),
+      State("log-page", "data"),
+      prevent_initial_call=True
+    )
+    def callback(name: str|None, levels: list[str], search: str|None, older: int, newer: int, tail: int, page: dict[str, Any]|None):
+      # Pages are read through the sparse index of the file, only the blocks holding the shown records are loaded.
+      # "oldest" and "newest" are the offsets older and newer reads continue from, also when a read stopped on its scan budget
+      if name is None:
+        raise PreventUpdate
+      index = self.logs.get_index(name)
+      trigger = ctx.triggered_id
+      same_file = page is not None and page["file"] == name
+      if trigger == "log-tail":
+        if not same_file or not page["latest"] or page["size"] == index.size: # type: ignore
+          raise PreventUpdate
+        return self._tail_log_page(index, levels, search, page) # type: ignore
+      if trigger == "log-older" and same_file:
+        if page["exhausted"]: # type: ignore
+          raise PreventUpdate
+        result = index.read(before=page["oldest"], limit=LOG_PAGE_SIZE, levels=levels, search=search) # type: ignore
+        records = result.records
+        # Without records the page is empty, newer reads then go back to the page it was opened from
+        newest, oldest, latest, exhausted = records[0].offset if records else page["oldest"] - 1, result.cursor, False, result.exhausted # type: ignore
+      elif trigger == "log-newer" and same_file and not page["latest"]: # type: ignore
+        result = index.read(after=page["newest"], limit=LOG_PAGE_SIZE, levels=levels, search=search) # type: ignore
+        if not result.records and result.exhausted:
+          result = index.read(limit=LOG_PAGE_SIZE, levels=levels, search=search)
+          records, newest, oldest, latest, exhausted = result.records, result.records[0].offset if result.records else index.size, result.cursor, True, result.exhausted
+        else:
+          records = result.records[::-1]
+          newest, oldest, latest, exhausted = records[0].offset if records else result.cursor, records[-1].offset if records else page["newest"] + 1, result.exhausted, False # type: ignore
+      else:
+        result = index.read(limit=LOG_PAGE_SIZE, levels=levels, search=search)
+        records, newest, oldest, latest, exhausted = result.records, result.records[0].offset if result.records else index.size, result.cursor, True, result.exhausted
+      page = {
+        "file": name,
+        "size": index.size,
+        "newest": newest,
+        "oldest": oldest,
+        "offsets": [record.offset for record in records],
+        "latest": latest,
+        "exhausted": exhausted
+      }
+      return self._render_log_records(records, exhausted), page
+  
+  def _tail_log_page(self, index: LogIndex, levels: list[str], search: str|None, page: dict[str, Any]) -> tuple[Patch, dict[str, Any]]:
+    """Prepends the records appended since the page was shown. Only the bytes after the newest shown record are read."""
+    result = index.read(after=page["newest"], limit=LOG_PAGE_SIZE, levels=levels, search=search)
+    records = result.records[::-1]
+    # A tail that stopped on the page size keeps the old size, so the next tick reads the rest.
+    # The cursor also moves past appended records the filters do not match, they are not read again
+    page = page | {"size": index.size if result.exhausted else page["size"], "newest": max(page["newest"], result.cursor)}
+    if not records:
+      return dash.no_update, page # type: ignore
+    children = Patch()
+    if not page["offsets"]:
+      children.clear()
+    for record in result.records:
+      children.prepend(self._render_log_record(record))
+    offsets = [record.offset for record in records] + page["offsets"]
+    # Records pushed past the page size are dropped from the bottom, older reads continue below the last one kept
+    for _ in range(len(offsets) - LOG_PAGE_SIZE):
+      del children[-1]
+    if len(offsets) > LOG_PAGE_SIZE:
+      offsets = offsets[:LOG_PAGE_SIZE]
+      page["oldest"], page["exhausted"] = offsets[-1], False
+    page["offsets"] = offsets
+    return children, page
+  
+  @classmethod
+  def _render_log_records(cls, records: list[LogRecord], exhausted: bool) -> list[html.Div]:
+    if records:
+      return [cls._render_log_record(record) for record in records]
+    if exhausted:
+      return [html.Div(className="log-empty", children="No records")]
+    return [html.Div(className="log-empty", children="No records in the scanned part of the file, page again to scan further")]
+  
+  @staticmethod
+  def _render_log_record(record: LogRecord) -> html.Div:
+    return html.Div(className=f"log-record log-{record.level.lower()}", children=[
+      html.Span(className="log-time", children=record.time),
+      html.Span(className="log-level", children=record.level),
+      html.Span(className="log-source", children=f"{record.filename}:{record.function}"),
+      html.Pre(children=record.message)
+    ])
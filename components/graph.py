@@ -21,11 +21,10 @@ def get_graph(uuid: uuid.UUID):
     html.Div(className="filter-container", children=[
       dcc.Dropdown(
         id={"type": "product-filter", "uuid": uuid},
-        options=db.puller.get_product_options(),
+        options=db.puller.get_product_options().options,
         placeholder="Select a product",
         clearable=False,
       ),
-      dcc.Interval(id="refresh-dropdown-options", interval=5000, n_intervals=0),
       html.Div(id={"type": "filter", "uuid": uuid}, className="filter", children=[
         dbc.ButtonGroup(
           id={"type": "button-group-filter", "uuid": uuid},
@@ -121,4 +120,5 @@ def get_graph(uuid: uuid.UUID):
     ]),
     dcc.Store(id={"type": "graph-data-storage", "uuid": uuid}, modified_timestamp=-1),
     dcc.Store(id={"type": "graph-time-frame-data-storage", "uuid": uuid}, modified_timestamp=-1),
+    dcc.Store(id={"type": "graph-series-storage", "uuid": uuid}, modified_timestamp=-1),
   ])
\ No newline at end of file
@@ -0,0 +1,62 @@
+import os
+import hashlib
+import json
+import logging
+import pandas as pd
+from typing import Any
+
+from database.dBManager import DBManager
+from database.queryCache import LRUCache, MISSING
+from database.salesFrame import SalesFrame, SalesFacets
+from .graphFactory import TotalSalesCountGraph, SalesSeries
+
+logger = logging.getLogger(__name__)
+
+class DatasetStore:
+  """Keeps the sales datasets of graphs on the server. Browsers only hold a small handle pointing at them.
+  Evicted datasets are rebuilt from the query cache, which other workers share."""
+  __slots__ = ("db", "datasets", "series")
+  def __init__(self, db: DBManager, max_bytes: int|None=None, series_max_bytes: int|None=None) -> None:
+    self.db = db
+    self.datasets = LRUCache(max_bytes or int(os.environ.get("dataset_store_bytes", 512 * 2**20)))
+    self.series = LRUCache(series_max_bytes or int(os.environ.get("series_store_bytes", 128 * 2**20)))
+
+  @staticmethod
+  def make_key(SKUs: list[str], data_version: int) -> str:
+    return hashlib.sha1(json.dumps([sorted(set(SKUs)), data_version]).encode()).hexdigest()
+
+  def put(self, uuid: str, SKUs: list[str]) -> dict[str, Any]:
+    """Loads the sales of the SKUs and returns the handle stored in the graph's dcc.Store."""
+    data_version = self.db.cache.data_version()
+    handle = {"uuid": uuid, "key": self.make_key(SKUs, data_version), "SKUs": sorted(set(SKUs)), "version": data_version}
+    self._load(handle)
+    return handle
+
+  def get(self, handle: dict[str, Any]) -> pd.DataFrame:
+    """Returns the dataset of the handle as a DataFrame sharing the buffers of the stored SalesFrame, to be treated as read only."""
+    return self._get_frame(handle).to_pandas()
+
+  def get_facets(self, handle: dict[str, Any]) -> SalesFacets:
+    """Returns the marketplaces, variant values and date bounds of the dataset of the handle, without touching its rows."""
+    return self._get_frame(handle).facets
+
+  def _get_frame(self, handle: dict[str, Any]) -> SalesFrame:
+    frame = self.datasets.get(handle["key"])
+    if frame is MISSING:
+      frame = self._load(handle)
+    return frame
+
+  def _load(self, handle: dict[str, Any]) -> SalesFrame:
+    frame = self.db.puller.get_product_sales(handle["SKUs"])
+    self.datasets.set(handle["key"], frame, frame.nbytes)
+    logger.debug("Dataset has been loaded into the store. %s", {"Handle": handle, "Rows": len(frame), "ObjectID": id(self)})
+    return frame
+
+  def get_series(self, handle: dict[str, Any], marketplaces: list[str], variants: list[str], groupby: str|None) -> SalesSeries:
+    """Returns the memoized daily series of the dataset for the filters, building it on the first request only."""
+    key = (handle["key"], tuple(sorted(marketplaces or [])), tuple(sorted(variants or [])), groupby)
+    series = self.series.get(key)
+    if series is MISSING:
+      series = TotalSalesCountGraph.build_series(self.get(handle), marketplaces or [], variants or [], groupby)
+      self.series.set(key, series, series.daily.nbytes + series.cumulative.nbytes)
+    return series
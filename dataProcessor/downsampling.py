@@ -0,0 +1,25 @@
+import numpy as np
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+  """Largest-Triangle-Three-Buckets downsampling. Returns the indices of the points to keep, first and last included.
+  The points kept are the ones forming the largest triangle with their neighbouring buckets, which preserves peaks and slopes."""
+  n = len(x)
+  if threshold >= n or threshold < 3:
+    return np.arange(n)
+  x = np.asarray(x, dtype="float64")
+  y = np.asarray(y, dtype="float64")
+  indices = np.empty(threshold, dtype="int64")
+  indices[0], indices[-1] = 0, n - 1
+  # Every bucket but the first and the last point is split evenly over the inner points
+  edges = np.linspace(1, n - 1, threshold - 1).astype("int64")
+  previous = 0
+  for i in range(threshold - 2):
+    start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+    next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+    if next_end <= next_start:
+      next_end = next_start + 1
+    next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+    areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+    previous = start + int(areas.argmax())
+    indices[i + 1] = previous
+  return indices
@@ -1,28 +1,75 @@
 import plotly
 import plotly.express as px
 from plotly.graph_objs import Figure
+import numpy as np
 import pandas as pd
 from typing import Any, Literal
 from abc import ABC, abstractmethod
 
+from .downsampling import lttb
+from monitoring.metrics import GRAPH_BUILD_SECONDS
+
+# Points plotted per figure before the resolution is lowered and the traces are downsampled
+POINT_BUDGET = 4000
+MIN_POINTS_PER_TRACE = 100
+# Points above which traces are drawn with WebGL instead of SVG
+WEBGL_THRESHOLD = 2000
+# Period alias -> approximate days in a period, finest first
+RESOLUTIONS = {"D": 1, "W": 7, "M": 31}
+
 class Graph(ABC):
   @abstractmethod
   def get_graph(self, dataframe: pd.DataFrame) -> Figure: ...
   
   @abstractmethod
-  def validate_kwargs(self, kwargs, required_kwargs) -> None:
+  def validate_kwargs(self, kwargs, required_kwargs, optional_kwargs=()) -> None:
     missing_kwargs = [kwarg for kwarg in required_kwargs if kwarg not in kwargs]
     if missing_kwargs:
         raise ValueError(f"Missing required keyword argument(s): {missing_kwargs}")
-    unexpected_kwargs = [kwarg for kwarg in kwargs if kwarg not in required_kwargs]
+    unexpected_kwargs = [kwarg for kwarg in kwargs if kwarg not in required_kwargs and kwarg not in optional_kwargs]
     if unexpected_kwargs:
         raise ValueError(f"Unexpected keyword argument(s): {unexpected_kwargs}")
 
+class SalesSeries:
+  """Daily and cumulative quantities of every group over the whole date range of a dataset.
+  Any time window is served by slicing the arrays and rebasing the cumulative values at the window start."""
+  __slots__ = ("dates", "groups", "daily", "cumulative")
+  def __init__(self, daily: pd.DataFrame) -> None:
+    self.dates: pd.DatetimeIndex = daily.index # type: ignore
+    self.groups = list(daily.columns)
+    self.daily = daily.to_numpy(dtype="int64")
+    self.cumulative = self.daily.cumsum(axis=0)
+  
+  def window(self, start: Any, end: Any) -> tuple[pd.DatetimeIndex, np.ndarray, np.ndarray]:
+    """Returns the days of the window with the daily and the window-cumulative quantities, shaped days x groups."""
+    days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), name="PostedDate")
+    if len(self.dates) == 0:
+      zeros = np.zeros((len(days), len(self.groups)), dtype="int64")
+      return days, zeros, zeros
+    positions = ((days - self.dates[0]) // pd.Timedelta(days=1)).to_numpy()
+    last = len(self.dates) - 1
+    # Row 0 of the padded arrays stands for the days before the series, where nothing has been sold yet
+    padded_cumulative = np.vstack([np.zeros((1, len(self.groups)), dtype="int64"), self.cumulative])
+    cumulative = padded_cumulative[np.clip(positions, -1, last) + 1] - padded_cumulative[np.clip(positions[0] - 1, -1, last) + 1]
+    inside = (positions >= 0) & (positions <= last)
+    daily = np.zeros((len(days), len(self.groups)), dtype="int64")
+    daily[inside] = self.daily[positions[inside]]
+    return days, daily, cumulative
+  
+  def to_compact(self) -> dict[str, Any]:
+    """Daily quantities per group from the first day of the series, the form sent to clientside callbacks."""
+    return {
+      "start": self.dates[0].strftime("%Y-%m-%d") if len(self.dates) else None,
+      "groups": [str(group) for group in self.groups],
+      "daily": self.daily.T.tolist()
+    }
+
 class TotalSalesCountGraph(Graph):
-  def __init__(self, dataframe: pd.DataFrame) -> None:
+  def __init__(self, dataframe: pd.DataFrame|None) -> None:
     self.df = dataframe
-    self.__dfs = []
+    self.resolution = "D"
     self.__required_kwargs = ["marketplaces", "variants", "groupby", "time_frame"]
+    self.__optional_kwargs = ["series"]
   
   def get_graph(self, **kwargs):
     self.validate_kwargs(kwargs)
@@ -30,81 +77,130 @@ class TotalSalesCountGraph(Graph):
     variants: list[str] = kwargs.get("variants") # type: ignore
     groupby: str|None = kwargs.get("groupby")
     time_frame: list[str] = kwargs.get("time_frame") # type: ignore
+    series: SalesSeries|None = kwargs.get("series")
     
-    self.handle_data_process(marketplaces, variants, groupby, time_frame)
+    self.handle_data_process(marketplaces, variants, groupby, time_frame, series)
     
     return self.__get_graph(groupby)
   
   def __get_graph(self, groupby: str|None):
-    if groupby is None:
-      color = None
-    elif groupby == "Marketplace":
-      color = "MarketplaceName"
-    else:
-      color = "Variant.All"
-    return px.line(
-      data_frame=self.df,
-      x="PostedDate",
-      y="QuantityShippedTrueCumulative",
-      color=color
-    )
-  
-  def handle_data_process(self, marketplaces: list[str], variants: list[str], groupby: str|None, time_frame: list[str]) -> None:
-    self.filter_dataframe(marketplaces, variants)
-    self.df["QuantityShippedTrue"] = self.df.apply(lambda row: self.get_quantity_shipped_true(row), axis=1)
-    self.df["PostedDate"] = pd.to_datetime(self.df["PostedDate"].str.split("T", expand=True)[0])
-    self.df = self.df[(self.df["PostedDate"] >= time_frame[0]) & (self.df["PostedDate"] <= time_frame[-1])].reset_index(drop=True)
-    self.groupby_filter(marketplaces, variants, groupby)
-    self.__dfs = list(map(self.fill_spaces_between_dates, self.__dfs))
-    for df_ in self.__dfs:
-      df_["QuantityShippedTrueCumulative"] = df_["QuantityShippedTrue"].cumsum()
-    self.df = pd.concat(self.__dfs)
-    print(time_frame)
-  
-  def filter_dataframe(self, marketplaces: list[str], variants: list[str]) -> None:
-    self.df = self.df[self.df["MarketplaceName"].isin(marketplaces)]
-    variant_columns = [column for column in self.df.columns if "Variant." in column]
-    for col in variant_columns:
-      self.df = self.df[self.df[col].isin(variants)]
+    color = self.get_color_column(groupby)
+    with GRAPH_BUILD_SECONDS.time(graph="TotalSalesCount", stage="figure"):
+      return px.line(
+        data_frame=self.df,
+        x="PostedDate",
+        y="QuantityShippedTrueCumulative",
+        color=color,
+        render_mode="webgl" if len(self.df) > WEBGL_THRESHOLD else "svg"
+      )
   
-  @staticmethod
-  def get_quantity_shipped_true(row) -> int:
-    """Turns QuantityShipped value to negative if shipments is a refund"""
-    if row["ShipmentType"] == "Order":
-      return row["QuantityShipped"]
-    else:
-      return -row["QuantityShipped"]
+  def handle_data_process(self, marketplaces: list[str], variants: list[str], groupby: str|None, time_frame: list[str], series: SalesSeries|None=None) -> None:
+    """Slices the time frame out of the series of the dataset, building the series first when no precomputed one is given.
+    The resolution is lowered from days to weeks or months, then traces are downsampled, until the figure fits in POINT_BUDGET."""
+    if series is None:
+      series = self.build_series(self.df, marketplaces, variants, groupby) # type: ignore
+    with GRAPH_BUILD_SECONDS.time(graph="TotalSalesCount", stage="dataframe"):
+      self.__build_dataframe(series, groupby, time_frame)
   
-  def groupby_filter(self, marketplaces: list[str], variants: list[str], groupby: str|None):
-    if groupby is None:
-      df_ = self.df.copy().groupby(by="PostedDate").agg("sum", numeric_only=True).reset_index()
-      self.__dfs = [df_]
-    elif groupby == "Marketplace":
-      for marketplace in marketplaces:
-        df_ = self.df[self.df["MarketplaceName"] == marketplace].copy()
-        df_ = df_.groupby(by="PostedDate").agg("sum").reset_index()
-        df_["MarketplaceName"] = marketplace
-        self.__dfs.append(df_)
-    elif groupby == "Variant":
-      variant_columns = [column for column in self.df.columns if "Variant." in column]
-      self.df["Variant.All"] = self.df[variant_columns].agg(" - ".join, axis=1)
-      for variant in variants:
-        df_ = self.df[self.df["Variant.All"] == variant].copy()
-        df_ = df_.groupby(by="PostedDate").agg("sum", numeric_only=True).reset_index()
-        df_["Variant.All"] = variant
-        self.__dfs.append(df_)
+  def __build_dataframe(self, series: SalesSeries, groupby: str|None, time_frame: list[str]) -> None:
+    days, daily, cumulative = series.window(time_frame[0], time_frame[-1])
+    trace_budget = max(MIN_POINTS_PER_TRACE, POINT_BUDGET // max(len(series.groups), 1))
+    self.resolution = self.get_resolution(len(days), trace_budget)
+    if self.resolution != "D":
+      days, daily, cumulative = self.resample(days, daily, cumulative, self.resolution)
+    
+    columns: dict[str, list[np.ndarray]] = {"PostedDate": [], "Group": [], "QuantityShippedTrue": [], "QuantityShippedTrueCumulative": []}
+    x, dates = days.asi8, days.to_numpy()
+    for index, group in enumerate(series.groups):
+      # Shape preserving downsampling of the cumulative line when even the coarsest resolution is over budget
+      kept = lttb(x, cumulative[:, index], trace_budget)
+      columns["PostedDate"].append(dates[kept])
+      columns["Group"].append(np.full(len(kept), group, dtype=object))
+      columns["QuantityShippedTrue"].append(daily[kept, index])
+      columns["QuantityShippedTrueCumulative"].append(cumulative[kept, index])
+    self.df = pd.DataFrame({key: np.concatenate(values) if values else np.empty(0) for key, values in columns.items()})
+    self.df = self.df.rename(columns={"Group": self.get_color_column(groupby)}) if groupby is not None else self.df.drop(columns="Group")
+  
+  @staticmethod
+  def get_resolution(days: int, trace_budget: int) -> str:
+    for resolution, period_days in RESOLUTIONS.items():
+      if days / period_days <= trace_budget:
+        return resolution
+    return list(RESOLUTIONS)[-1]
   
   @staticmethod
-  def fill_spaces_between_dates(dataframe: pd.DataFrame, time_frame=None):
+  def resample(days: pd.DatetimeIndex, daily: np.ndarray, cumulative: np.ndarray, resolution: str) -> tuple[pd.DatetimeIndex, np.ndarray, np.ndarray]:
+    """Sums the daily quantities per period and keeps the cumulative value of the last day of each period."""
+    if len(days) == 0:
+      return days, daily, cumulative
+    periods = days.to_period(resolution).asi8
+    ends = np.flatnonzero(np.r_[periods[1:] != periods[:-1], True])
+    starts = np.r_[0, ends[:-1] + 1]
+    return days[ends], np.add.reduceat(daily, starts, axis=0), cumulative[ends]
+  
+  @classmethod
+  def build_series(cls, dataframe: pd.DataFrame, marketplaces: list[str], variants: list[str], groupby: str|None) -> SalesSeries:
+    """Filters the events and sums them per day and group over the whole date range of the dataset, in one vectorized pass."""
+    with GRAPH_BUILD_SECONDS.time(graph="TotalSalesCount", stage="series"):
+      return cls.__build_series(dataframe, marketplaces, variants, groupby)
+  
+  @classmethod
+  def __build_series(cls, dataframe: pd.DataFrame, marketplaces: list[str], variants: list[str], groupby: str|None) -> SalesSeries:
     if dataframe.empty:
-      return dataframe
-    all_dates = pd.DataFrame(pd.date_range(dataframe["PostedDate"].min(), dataframe["PostedDate"].max()), columns=["PostedDate"])
-    all_dates_df = all_dates.merge(right=dataframe, how="left", on="PostedDate")
-    all_dates_df[["QuantityShipped", "QuantityShippedTrue"]] = all_dates_df[["QuantityShipped", "QuantityShippedTrue"]].fillna(0.0).astype(int)
-    return all_dates_df
+      return SalesSeries(pd.DataFrame(index=pd.DatetimeIndex([], name="PostedDate")))
+    variant_columns = [column for column in dataframe.columns if "Variant." in column]
+    mask = dataframe["MarketplaceName"].isin(marketplaces)
+    for column in variant_columns:
+      mask &= dataframe[column].isin(variants)
+    df = dataframe.loc[mask]
+    
+    dates = pd.to_datetime(df["PostedDate"], utc=True).dt.tz_localize(None).dt.normalize()
+    quantity = df["QuantityShipped"].astype("int64")
+    events = pd.DataFrame({
+      "Group": cls.get_group_keys(df, groupby, variant_columns),
+      "PostedDate": dates,
+      "QuantityShippedTrue": quantity.where(df["ShipmentType"] == "Order", -quantity) # Refunds count negatively
+    })
+    if events.empty:
+      return SalesSeries(pd.DataFrame(index=pd.DatetimeIndex([], name="PostedDate")))
+    
+    daily = events.groupby(["PostedDate", "Group"], observed=True)["QuantityShippedTrue"].sum().unstack("Group", fill_value=0)
+    daily = daily.reindex(pd.date_range(dates.min(), dates.max(), name="PostedDate"), fill_value=0)
+    return SalesSeries(daily)
+  
+  @classmethod
+  def get_clientside_data(cls, series: dict[str|None, SalesSeries]) -> dict[str, Any]:
+    """Everything the clientside callback needs to draw the graph for any groupby and time frame without the server."""
+    empty = pd.DataFrame({"PostedDate": pd.DatetimeIndex([]), "QuantityShippedTrueCumulative": pd.Series([], dtype="int64")})
+    return {
+      "series": {str(groupby): series_.to_compact() for groupby, series_ in series.items()},
+      "colorColumns": {str(groupby): cls.get_color_column(groupby) for groupby in series},
+      "layout": px.line(data_frame=empty, x="PostedDate", y="QuantityShippedTrueCumulative").layout.to_plotly_json(),
+      "pointBudget": POINT_BUDGET,
+      "minPointsPerTrace": MIN_POINTS_PER_TRACE,
+      "webglThreshold": WEBGL_THRESHOLD
+    }
+  
+  @staticmethod
+  def get_group_keys(df: pd.DataFrame, groupby: str|None, variant_columns: list[str]) -> pd.Series:
+    if groupby == "Marketplace":
+      return df["MarketplaceName"]
+    if groupby == "Variant" and variant_columns:
+      keys = df[variant_columns[0]].astype(str)
+      return keys.str.cat([df[column].astype(str) for column in variant_columns[1:]], sep=" - ") if len(variant_columns) > 1 else keys
+    return pd.Series("All", index=df.index)
+  
+  @staticmethod
+  def get_color_column(groupby: str|None) -> str|None:
+    if groupby is None:
+      return None
+    elif groupby == "Marketplace":
+      return "MarketplaceName"
+    else:
+      return "Variant.All"
   
   def validate_kwargs(self, kwargs) -> None:
-    return super().validate_kwargs(kwargs, self.__required_kwargs)
+    return super().validate_kwargs(kwargs, self.__required_kwargs, self.__optional_kwargs)
 
 class GraphFactory:
   factories = {
@@ -113,5 +209,5 @@ class GraphFactory:
   
   GraphType = Literal["total_sales_count"]
   @classmethod
-  def get_graph(cls, type_: GraphType, dataframe: pd.DataFrame, **kwargs):
+  def get_graph(cls, type_: GraphType, dataframe: pd.DataFrame|None, **kwargs):
     return cls.factories[type_](dataframe).get_graph(**kwargs)
\ No newline at end of file
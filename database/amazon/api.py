@@ -1,53 +1,92 @@
 # ---------- SETUP ----------
-import os, logging, sys
+import os, time, hashlib, logging, sys
 from dotenv import load_dotenv
-from datetime import date
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-LOG_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, f"../../logs/{date.today()}.log"))
-logging.basicConfig(
-  level=logging.INFO,
-  format="[ %(asctime)s ] - %(thread)d - %(filename)s - %(funcName)s - [ %(levelname)s ] - %(message)s",
-  datefmt="%Y-%m-%d %H:%M:%S",
-  filename=LOG_DIR
-)
 load_dotenv(os.path.abspath(os.path.join(SCRIPT_DIR, "../../.env")))
 
 # ---------- IMPORTS ----------
-import time
-from typing import Callable
+from typing import Callable, Any, Generator
 from sp_api.base import SellingApiRequestThrottledException, Marketplaces
 
+from .throttle import Throttler
+from monitoring.logger import SAMPLED
+from monitoring.metrics import SP_API_SECONDS
+
+logger = logging.getLogger(__name__)
+
 class AmazonApiManager:
   __slots__ = tuple()
+  throttler = Throttler() # Shared by every thread of the process
   def __init__(self) -> None:
-    logging.debug("AmazonApiManager object has been created and initialized. {debug_info}".format(debug_info={"ObjectID": id(self)}))
+    logger.debug("AmazonApiManager object has been created and initialized. %s", {"ObjectID": id(self)})
   
   def get_payload(self, request_handler: Callable, marketplace: Marketplaces, request: str, *args: str, **kwargs: dict[str, str]):
-    logging.info("Getting payload. {debug_info}".format(debug_info={"Request Handler": request_handler, "Marketplace": marketplace, "Request": request, "args": args, "kwargs": kwargs}))
+    logger.info("Getting payload of '%s'. %s %s %s", request, marketplace, args, kwargs, extra=SAMPLED)
     try:
-      if kwargs.get("response") is not None:
-        response = request_handler(credentials=self.keys, marketplace=marketplace, **kwargs["response"])
-      else:
-        response = request_handler(credentials=self.keys, marketplace=marketplace)
-      if kwargs.get("reqkwargs") is not None:
-        data = getattr(response, request)(**kwargs["reqkwargs"])
-      else:
-        data = getattr(response, request)()
+      data = self._send(request_handler, marketplace, request, **kwargs)
       payload = data.payload
       try:
         for arg in args:
           payload = payload.get(arg)
       except AttributeError as e:
-        logging.exception("Failed to retrieve payload of response! Unvalid argument(s). {debug_info}".format(debug_info={"Request Handler": request_handler, "Marketplace": marketplace, "Method": request, "args": args, "kwargs": kwargs}))
+        logger.exception("Failed to retrieve payload of response! Unvalid argument(s). %s", {"Request Handler": request_handler, "Marketplace": marketplace, "Method": request, "args": args, "kwargs": kwargs})
         raise e
       else:
         return payload
-    except SellingApiRequestThrottledException:
-      logging.warning(f"API quota has been exceeded. Waiting for 5 seconds to refresh quota.")
-      time.sleep(5)
-      return self.get_payload(request_handler, marketplace, request, *args, **kwargs)
     finally:
-      logging.info("Payload retrieved. {debug_info}".format(debug_info={"Request Handler": request_handler, "Marketplace": marketplace, "Request": request, "args": args, "kwargs": kwargs}))
+      logger.info("Payload of '%s' retrieved. %s %s %s", request, marketplace, args, kwargs, extra=SAMPLED)
+  
+  def iter_payload(self, request_handler: Callable, marketplace: Marketplaces, request: str, *args: str, **kwargs: dict[str, str]) -> Generator[Any, None, None]:
+    """Yields the payload of every page of the request, following NextToken until the last page."""
+    reqkwargs = dict(kwargs.get("reqkwargs") or {})
+    page = 0
+    while True:
+      logger.info("Getting page %s of payload of '%s'. %s %s %s", page, request, marketplace, args, reqkwargs, extra=SAMPLED)
+      data = self._send(request_handler, marketplace, request, **(kwargs | {"reqkwargs": reqkwargs}))
+      payload = data.payload
+      next_token = getattr(data, "next_token", None) or (payload.get("NextToken") if isinstance(payload, dict) else None)
+      try:
+        for arg in args:
+          payload = payload.get(arg)
+      except AttributeError as e:
+        logger.exception("Failed to retrieve payload of response! Unvalid argument(s). %s", {"Request Handler": request_handler, "Marketplace": marketplace, "Method": request, "args": args, "kwargs": kwargs})
+        raise e
+      yield payload
+      if not next_token:
+        return
+      reqkwargs["NextToken"] = next_token
+      page += 1
+  
+  def _send(self, request_handler: Callable, marketplace: Marketplaces, request: str, **kwargs: dict[str, str]) -> Any:
+    """Sends the request once its token bucket allows it, retrying throttled responses with jittered exponential backoff."""
+    marketplace_id = getattr(marketplace, "marketplace_id", str(marketplace))
+    for attempt in range(self.throttler.max_retries + 1):
+      self.throttler.acquire(request, marketplace_id)
+      start = time.perf_counter()
+      try:
+        if kwargs.get("response") is not None:
+          response = request_handler(credentials=self.keys, marketplace=marketplace, **kwargs["response"])
+        else:
+          response = request_handler(credentials=self.keys, marketplace=marketplace)
+        if kwargs.get("reqkwargs") is not None:
+          data = getattr(response, request)(**kwargs["reqkwargs"])
+        else:
+          data = getattr(response, request)()
+      except SellingApiRequestThrottledException as e:
+        SP_API_SECONDS.observe(time.perf_counter() - start, operation=request, outcome="throttled")
+        self.throttler.update_from_headers(request, marketplace_id, getattr(e, "headers", None))
+        if attempt == self.throttler.max_retries:
+          logger.error("API quota of '%s' is still exceeded after %s attempts. %s", request, attempt + 1, {"Marketplace": marketplace, "Throttling": self.throttler.stats().get(request)})
+          raise e
+        delay = self.throttler.backoff(request, marketplace_id, attempt)
+        logger.warning("API quota of '%s' has been exceeded. Retried after %.2f seconds. %s", request, delay, {"Marketplace": marketplace, "Attempt": attempt + 1})
+      except Exception:
+        SP_API_SECONDS.observe(time.perf_counter() - start, operation=request, outcome="error")
+        raise
+      else:
+        SP_API_SECONDS.observe(time.perf_counter() - start, operation=request, outcome="ok")
+        self.throttler.update_from_headers(request, marketplace_id, getattr(data, "headers", None))
+        return data
   
   @property
   def keys(self) -> dict[str, str]:
@@ -60,6 +99,12 @@ class AmazonApiManager:
       "refresh_token": os.environ.get("refresh_token")
     } # type: ignore
   
+  @property
+  def selling_partner(self) -> str:
+    """Identifies the selling partner authorization of the credentials without exposing them."""
+    keys = self.keys
+    return hashlib.sha1(f"{keys['lwa_app_id']}:{keys['refresh_token']}".encode()).hexdigest()[:16]
+  
   def get_report(self):
     raise NotImplementedError()
 
@@ -0,0 +1,111 @@
+import time
+import random
+import threading
+from collections import defaultdict
+
+from monitoring.metrics import SP_API_THROTTLE_WAIT_SECONDS, SP_API_BACKOFF_SECONDS
+
+# Documented SP-API usage plans: operation -> (requests per second, burst)
+OPERATION_RATES: dict[str, tuple[float, int]] = {
+  "get_orders": (0.0167, 20),
+  "get_order": (0.5, 30),
+  "get_order_items": (0.5, 30),
+  "get_financial_events_for_order": (0.5, 30),
+  "list_financial_events": (0.5, 30),
+}
+DEFAULT_RATE = (1.0, 1)
+RATE_LIMIT_HEADER = "x-amzn-RateLimit-Limit"
+
+class TokenBucket:
+  """Thread safe token bucket refilled at `rate` tokens per second, holding at most `burst` tokens."""
+  __slots__ = ("rate", "burst", "_tokens", "_updated", "_lock")
+  def __init__(self, rate: float, burst: int) -> None:
+    self.rate = rate
+    self.burst = burst
+    self._tokens = float(burst)
+    self._updated = time.monotonic()
+    self._lock = threading.Lock()
+
+  def _refill(self, now: float) -> None:
+    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+    self._updated = now
+
+  def acquire(self) -> float:
+    """Takes a token, blocking until one is available. Returns the time waited in seconds."""
+    with self._lock:
+      now = time.monotonic()
+      self._refill(now)
+      self._tokens -= 1
+      # A negative balance is a reservation: the caller sleeps until its token has been refilled
+      wait = max(0.0, -self._tokens / self.rate)
+    if wait:
+      time.sleep(wait)
+    return wait
+
+  def drain(self) -> None:
+    """Empties the bucket after a throttled response so that other threads stop sending as well."""
+    with self._lock:
+      self._refill(time.monotonic())
+      self._tokens = min(self._tokens, 0.0)
+
+  def set_rate(self, rate: float) -> None:
+    with self._lock:
+      self._refill(time.monotonic())
+      self.rate = rate
+
+class Throttler:
+  """Keeps one token bucket per (operation, marketplace) and the counters of the throttling subsystem.
+  Buckets live in process memory, so only one process may call SP-API per selling partner. The Scheduler enforces it."""
+  __slots__ = ("max_retries", "base_delay", "max_delay", "_buckets", "_lock", "_counters")
+  def __init__(self, max_retries: int=8, base_delay: float=1.0, max_delay: float=60.0) -> None:
+    self.max_retries = max_retries
+    self.base_delay = base_delay
+    self.max_delay = max_delay
+    self._buckets: dict[tuple[str, str], TokenBucket] = {}
+    self._lock = threading.Lock()
+    self._counters: defaultdict[str, dict[str, float]] = defaultdict(lambda: {"Requests": 0, "Throttled": 0, "WaitSeconds": 0.0, "BackoffSeconds": 0.0})
+
+  def bucket(self, operation: str, marketplace: str) -> TokenBucket:
+    key = (operation, marketplace)
+    if key not in self._buckets:
+      with self._lock:
+        if key not in self._buckets:
+          self._buckets[key] = TokenBucket(*OPERATION_RATES.get(operation, DEFAULT_RATE))
+    return self._buckets[key]
+
+  def acquire(self, operation: str, marketplace: str) -> float:
+    wait = self.bucket(operation, marketplace).acquire()
+    with self._lock:
+      self._counters[operation]["Requests"] += 1
+      self._counters[operation]["WaitSeconds"] += wait
+    SP_API_THROTTLE_WAIT_SECONDS.observe(wait, operation=operation)
+    return wait
+
+  def update_from_headers(self, operation: str, marketplace: str, headers: dict[str, str]|None) -> None:
+    """Adjusts the refill rate of the bucket to the limit reported by SP-API for this selling partner."""
+    if not headers:
+      return
+    limit = headers.get(RATE_LIMIT_HEADER) or headers.get(RATE_LIMIT_HEADER.lower())
+    try:
+      rate = float(limit) # type: ignore
+    except (TypeError, ValueError):
+      return
+    if rate > 0:
+      bucket = self.bucket(operation, marketplace)
+      if bucket.rate != rate:
+        bucket.set_rate(rate)
+
+  def backoff(self, operation: str, marketplace: str, attempt: int) -> float:
+    """Sleeps for a full-jitter exponential backoff after a throttled response and returns the delay."""
+    self.bucket(operation, marketplace).drain()
+    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+    with self._lock:
+      self._counters[operation]["Throttled"] += 1
+      self._counters[operation]["BackoffSeconds"] += delay
+    SP_API_BACKOFF_SECONDS.observe(delay, operation=operation)
+    time.sleep(delay)
+    return delay
+
+  def stats(self) -> dict[str, dict[str, float]]:
+    with self._lock:
+      return {operation: counters.copy() for operation, counters in self._counters.items()}
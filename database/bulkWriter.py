@@ -0,0 +1,70 @@
+import time
+import logging
+import hashlib
+import bson
+import pymongo
+from typing import Any, NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .mongoClient import MongoClientManager
+from monitoring.metrics import BULK_WRITE_SECONDS, BULK_WRITE_DOCUMENTS
+
+logger = logging.getLogger(__name__)
+
+CONTENT_HASH_FIELD = "ContentHash"
+# Fields that change on every write without the document itself changing
+VOLATILE_FIELDS = ("UpdatedAt", CONTENT_HASH_FIELD)
+
+class BulkWriteReport(NamedTuple):
+  inserted: int = 0
+  modified: int = 0
+  skipped: int = 0
+
+  def __add__(self, other: "BulkWriteReport") -> "BulkWriteReport": # type: ignore
+    return BulkWriteReport(self.inserted + other.inserted, self.modified + other.modified, self.skipped + other.skipped)
+
+def content_hash(document: dict[str, Any]) -> str:
+  return hashlib.blake2b(bson.encode({key: value for key, value in document.items() if key not in VOLATILE_FIELDS}), digest_size=16).hexdigest()
+
+def key_of(value: Any) -> Any:
+  """Hashable form of a key value. Embedded document keys, such as the group keys of rollups, compare by their bson encoding."""
+  return bson.encode(value) if isinstance(value, dict) else value
+
+class BulkWriter:
+  """Upserts documents in bounded, unordered chunks and skips the ones whose content hash is already stored."""
+  __slots__ = ("client", "chunk_size", "max_workers")
+  def __init__(self, client: MongoClientManager, chunk_size: int=1000, max_workers: int=4) -> None:
+    self.client = client
+    self.chunk_size = chunk_size
+    self.max_workers = max_workers
+
+  def upsert(self, collection_name: str, documents: list[dict[str, Any]], key: str) -> BulkWriteReport:
+    start = time.perf_counter()
+    chunks = [documents[i:i + self.chunk_size] for i in range(0, len(documents), self.chunk_size)]
+    if len(chunks) <= 1 or self.max_workers <= 1:
+      reports = [self._upsert_chunk(collection_name, chunk, key) for chunk in chunks]
+    else:
+      with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks)), thread_name_prefix=f"bulk_write_{collection_name}") as pool:
+        reports = list(pool.map(lambda chunk: self._upsert_chunk(collection_name, chunk, key), chunks))
+    report = sum(reports, BulkWriteReport())
+    BULK_WRITE_SECONDS.observe(time.perf_counter() - start, collection=collection_name)
+    for result, count in report._asdict().items():
+      BULK_WRITE_DOCUMENTS.inc(count, collection=collection_name, result=result)
+    return report
+
+  def _upsert_chunk(self, collection_name: str, chunk: list[dict[str, Any]], key: str) -> BulkWriteReport:
+    collection = self.client[collection_name]
+    hashes = {key_of(document[key]): content_hash(document) for document in chunk}
+    cursor = collection.find({key: {"$in": [document[key] for document in chunk]}}, {key: 1, CONTENT_HASH_FIELD: 1})
+    stored = {key_of(document[key]): document.get(CONTENT_HASH_FIELD) for document in cursor}
+    operations = [pymongo.ReplaceOne(
+      filter={key: document[key]},
+      replacement=document | {CONTENT_HASH_FIELD: hashes[key_of(document[key])]},
+      upsert=True
+    ) for document in chunk if stored.get(key_of(document[key])) != hashes[key_of(document[key])]]
+    skipped = len(chunk) - len(operations)
+    if not operations:
+      return BulkWriteReport(skipped=skipped)
+    result = collection.bulk_write(operations, ordered=False)
+    logger.debug("Chunk has been written into collection '%s'. Inserted: %s, Modified: %s, Skipped: %s", collection_name, result.upserted_count, result.modified_count, skipped)
+    return BulkWriteReport(result.upserted_count, result.modified_count, skipped)
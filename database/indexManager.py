@@ -0,0 +1,59 @@
+import logging
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+from .mongoClient import MongoClientManager
+
+logger = logging.getLogger(__name__)
+
+# ----- Indexes Required By Queries -----
+INDEXES: dict[str, list[IndexModel]] = {
+  "WeeklyTopKeywords": [
+    IndexModel([("SearchTerm", ASCENDING), ("Date", ASCENDING)], name="SearchTerm_Date"),
+    IndexModel([("Department", ASCENDING), ("Date", ASCENDING), ("SearchFrequencyRank", ASCENDING)], name="Department_Date_SearchFrequencyRank"),
+    IndexModel([("Date", ASCENDING), ("SearchFrequencyRankDelta", DESCENDING)], name="Date_SearchFrequencyRankDelta"),
+    IndexModel([("Department", ASCENDING), ("Date", ASCENDING), ("SearchFrequencyRankDelta", DESCENDING)], name="Department_Date_SearchFrequencyRankDelta"),
+  ],
+  "Finances": [
+    IndexModel([("ShipmentEventList.ShipmentItemList.SellerSKU", ASCENDING)], name="ShipmentSellerSKU"),
+    IndexModel([("RefundEventList.ShipmentItemAdjustmentList.SellerSKU", ASCENDING)], name="RefundSellerSKU"),
+    IndexModel([("ShipmentEventList.PostedDate", ASCENDING)], name="ShipmentPostedDate"),
+    IndexModel([("RefundEventList.PostedDate", ASCENDING)], name="RefundPostedDate"),
+  ],
+  "DailySales": [
+    IndexModel([("SKU", ASCENDING), ("Date", ASCENDING)], name="SKU_Date"),
+  ],
+  "Products": [
+    IndexModel([("SKU", ASCENDING)], name="SKU"),
+    IndexModel([("Name", ASCENDING), ("SKU", ASCENDING)], name="Name_SKU"),
+  ],
+}
+
+class IndexManager:
+  """Creates the indexes listed in INDEXES. Creating an existing index is a no-op on the server."""
+  __slots__ = ("client", "_ensured")
+  def __init__(self, client: MongoClientManager) -> None:
+    self.client = client
+    self._ensured: set[str] = set()
+
+  def ensure(self, collection_name: str|None=None) -> None:
+    """Creates the indexes of the given collection, or of every collection when none is given, once per process."""
+    collection_names = [collection_name] if collection_name is not None else list(INDEXES)
+    for name in collection_names:
+      if name in self._ensured or name not in INDEXES:
+        continue
+      created = self.client[name].create_indexes(INDEXES[name])
+      missing = self.verify(name)[name]
+      if missing:
+        logger.error("Indexes of collection '%s' are missing after creation. %s", name, {"Missing": missing, "ObjectID": id(self)})
+        continue
+      self._ensured.add(name)
+      logger.info("Indexes of collection '%s' have been ensured. %s", name, {"Indexes": created, "ObjectID": id(self)})
+
+  def verify(self, collection_name: str|None=None) -> dict[str, list[str]]:
+    """Returns the names of the expected indexes whose key pattern does not exist on the server, per collection."""
+    collection_names = [collection_name] if collection_name is not None else list(INDEXES)
+    missing = {}
+    for name in collection_names:
+      existing = [list(index["key"]) for index in self.client[name].index_information().values()]
+      missing[name] = [index.document["name"] for index in INDEXES.get(name, []) if list(index.document["key"].items()) not in existing]
+    return missing
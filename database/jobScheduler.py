@@ -0,0 +1,190 @@
+import os
+import glob
+import time
+import shutil
+import socket
+import logging
+import threading
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, NamedTuple
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from sp_api.base import Marketplaces
+
+from .dBManager import DBManager
+from .utils.constant import JobState
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ----- Schedules -----
+env = lambda key, default: os.environ.get(key, default)
+SCHEDULES = {
+  "sync_orders": float(env("sync_orders_interval", 900)),
+  "import_keywords": float(env("import_keywords_interval", 3600)),
+}
+# Jobs of a kind running at once in a scheduler process, whatever their keys
+CONCURRENCY = {
+  "sync_orders": int(env("sync_orders_concurrency", 2)),
+  "import_keywords": int(env("import_keywords_concurrency", 1)),
+}
+SYNC_MARKETPLACES = [name.strip() for name in env("sync_marketplaces", "US").split(",") if name.strip()]
+KEYWORDS_IMPORT_DIR = env("keywords_import_dir", os.path.abspath(os.path.join(SCRIPT_DIR, "../imports/keywords")))
+
+class Job(NamedTuple):
+  key: str # Unique across processes, leases are taken on it
+  kind: str
+  interval: float # Seconds between the end of a run and the start of the next one
+  run: Callable[[], Any]
+
+def get_jobs(db: DBManager) -> list[Job]:
+  """Jobs of the configured schedules: one incremental order sync per marketplace and the keyword imports."""
+  jobs = [
+    Job(f"sync_orders.{name}", "sync_orders", SCHEDULES["sync_orders"], lambda marketplace=Marketplaces[name]: db.inserter.sync_orders(marketplace))
+    for name in SYNC_MARKETPLACES
+  ]
+  jobs.append(Job("import_keywords", "import_keywords", SCHEDULES["import_keywords"], lambda: import_keywords_directory(db, KEYWORDS_IMPORT_DIR)))
+  return jobs
+
+def import_keywords_directory(db: DBManager, path: str) -> int:
+  """Imports every weekly top keywords csv dropped into the directory, then moves it into its 'imported' subdirectory.
+  Files left behind by a failed run are imported again on the next one, replacing the keywords of their week."""
+  imported_dir = os.path.join(path, "imported")
+  os.makedirs(imported_dir, exist_ok=True)
+  inserted = 0
+  for file in sorted(glob.glob(os.path.join(path, "*.csv"))):
+    inserted += db.inserter.add_weekly_top_keywords(file)
+    shutil.move(file, os.path.join(imported_dir, os.path.basename(file)))
+  return inserted
+
+class Scheduler:
+  """Runs ingestion jobs on their schedules in a worker pool of its own, away from the Dash process.
+  Job state lives in collection 'Jobs'. A run holds a lease on its job document, so the same job never overlaps itself,
+  even across scheduler processes. Leases of crashed processes expire after `lease_seconds`.
+  SP-API rate limits are tracked in process memory, so a scheduler also holds a lease on its selling partner and
+  refuses to start while another live scheduler process holds it."""
+  __slots__ = ("db", "jobs", "owner", "partner_key", "workers", "lease_seconds", "tick_seconds", "_active", "_lock", "_stop")
+  def __init__(self, db: DBManager, jobs: list[Job], workers: int|None=None, lease_seconds: float|None=None, tick_seconds: float|None=None) -> None:
+    self.db = db
+    self.jobs = {job.key: job for job in jobs}
+    self.owner = f"{socket.gethostname()}:{os.getpid()}"
+    self.partner_key = f"scheduler.{db.inserter.api.selling_partner}"
+    self.workers = workers or int(env("scheduler_workers", 4))
+    self.lease_seconds = lease_seconds or float(env("scheduler_lease_seconds", 600))
+    self.tick_seconds = tick_seconds or float(env("scheduler_tick_seconds", 5))
+    self._active: dict[str, str] = {} # Key -> kind of the jobs queued or running in this process
+    self._lock = threading.Lock()
+    self._stop = threading.Event()
+
+  @property
+  def collection(self):
+    return self.db.client["Jobs"]
+
+  @staticmethod
+  def now() -> datetime:
+    return datetime.now(timezone.utc)
+
+  def run_forever(self) -> None:
+    if not self._acquire(self.partner_key, "scheduler"):
+      logger.critical("Another scheduler process holds the selling partner, only one may share its SP-API quota. %s", {"Key": self.partner_key, "Owner": self.owner, "ObjectID": id(self)})
+      raise RuntimeError(f"Selling partner lease '{self.partner_key}' is held by another scheduler process")
+    logger.info("Scheduler has been started. %s", {"Owner": self.owner, "Jobs": list(self.jobs), "Workers": self.workers, "ObjectID": id(self)})
+    finished = threading.Event()
+    threading.Thread(target=self._heartbeat, args=(finished, ), name="scheduler_heartbeat", daemon=True).start()
+    # The executor's queue is the job queue, jobs wait there for a free worker
+    with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scheduler_worker") as pool:
+      while not self._stop.is_set():
+        try:
+          for job in self._get_due_jobs():
+            pool.submit(self._execute, job)
+        except Exception:
+          logger.error("Failed to dispatch due jobs. %s", {"Owner": self.owner, "ObjectID": id(self)}, exc_info=True)
+        self._stop.wait(self.tick_seconds)
+    finished.set()
+    self.collection.update_one({"_id": self.partner_key, "Owner": self.owner}, {"$set": {"State": JobState.Succeeded, "LeaseExpiresAt": None, "LastFinishedAt": self.now()}})
+    logger.info("Scheduler has been stopped. %s", {"Owner": self.owner, "ObjectID": id(self)})
+
+  def stop(self) -> None:
+    """Stops dispatching. Running jobs are finished before run_forever returns."""
+    self._stop.set()
+
+  def _get_due_jobs(self) -> list[Job]:
+    states = {state["_id"]: state for state in self.collection.find({"_id": {"$in": list(self.jobs)}}, {"NextRunAt": 1, "LeaseExpiresAt": 1})}
+    now = self.now()
+    due = []
+    with self._lock:
+      for key, job in self.jobs.items():
+        state = states.get(key, {})
+        next_run = state.get("NextRunAt")
+        lease = state.get("LeaseExpiresAt")
+        if key in self._active or (next_run is not None and next_run.replace(tzinfo=timezone.utc) > now) or (lease is not None and lease.replace(tzinfo=timezone.utc) > now):
+          continue
+        if sum(kind == job.kind for kind in self._active.values()) >= CONCURRENCY.get(job.kind, 1):
+          continue
+        self._active[key] = job.kind
+        due.append(job)
+    return due
+
+  def _execute(self, job: Job) -> None:
+    try:
+      if not self._acquire(job.key, job.kind):
+        logger.info("Job '%s' is already running elsewhere, skipped. %s", job.key, {"Owner": self.owner, "ObjectID": id(self)})
+        return
+      logger.info("Job '%s' has been started. %s", job.key, {"Owner": self.owner, "ObjectID": id(self)})
+      start = time.perf_counter()
+      try:
+        result = job.run()
+      except Exception as e:
+        logger.error("Job '%s' has failed. %s", job.key, {"Owner": self.owner, "ObjectID": id(self)}, exc_info=True)
+        self._release(job, JobState.Failed, time.perf_counter() - start, error=repr(e))
+      else:
+        logger.info("Job '%s' has succeeded. %s", job.key, {"Result": result, "Seconds": time.perf_counter() - start, "Owner": self.owner, "ObjectID": id(self)})
+        self._release(job, JobState.Succeeded, time.perf_counter() - start, result=result)
+    except Exception:
+      logger.error("Failed to update the state of job '%s'. %s", job.key, {"Owner": self.owner, "ObjectID": id(self)}, exc_info=True)
+    finally:
+      with self._lock:
+        self._active.pop(job.key, None)
+
+  def _acquire(self, key: str, kind: str) -> bool:
+    """Takes the lease of the key unless another live run holds it. The upsert loses with a duplicate key error in that case."""
+    now = self.now()
+    try:
+      self.collection.find_one_and_update(
+        {"_id": key, "$or": [{"LeaseExpiresAt": None}, {"LeaseExpiresAt": {"$lte": now}}]},
+        {
+          "$set": {"Kind": kind, "State": JobState.Running, "Owner": self.owner, "LeaseExpiresAt": now + timedelta(seconds=self.lease_seconds), "LastStartedAt": now},
+          "$inc": {"Runs": 1}
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+      )
+    except DuplicateKeyError:
+      return False
+    return True
+
+  def _release(self, job: Job, state: JobState, seconds: float, result: Any=None, error: str|None=None) -> None:
+    now = self.now()
+    self.collection.update_one(
+      {"_id": job.key, "Owner": self.owner},
+      {
+        "$set": {"State": state, "LeaseExpiresAt": None, "LastFinishedAt": now, "LastSeconds": seconds, "LastResult": result, "LastError": error, "NextRunAt": now + timedelta(seconds=job.interval)},
+        "$inc": {"Failures": int(state == JobState.Failed)}
+      }
+    )
+
+  def _heartbeat(self, finished: threading.Event) -> None:
+    # Leases of long runs are renewed well before they expire, also while running jobs finish after a stop
+    while not finished.wait(self.lease_seconds / 3):
+      with self._lock:
+        keys = [self.partner_key, *self._active]
+      if keys:
+        try:
+          self.collection.update_many(
+            {"_id": {"$in": keys}, "Owner": self.owner, "State": JobState.Running},
+            {"$set": {"LeaseExpiresAt": self.now() + timedelta(seconds=self.lease_seconds)}}
+          )
+        except Exception:
+          logger.warning("Failed to renew job leases. %s", {"Keys": keys, "Owner": self.owner, "ObjectID": id(self)}, exc_info=True)
@@ -0,0 +1,68 @@
+import os
+import logging
+import threading
+import pymongo
+from typing import Any
+from pymongo.database import Database
+from pymongo.collection import Collection
+
+logger = logging.getLogger(__name__)
+
+class MongoClientManager:
+  """Holds one pooled MongoClient per process.
+  The client is created lazily and recreated after a fork, since pymongo clients must not be shared between processes."""
+  __slots__ = ("uri", "database_name", "options", "_client", "_pid", "_lock")
+  def __init__(self, uri: str|None=None, database_name: str="Amazon", **options: Any) -> None:
+    self.uri = uri or os.environ.get("mongodb_uri", "mongodb://localhost:27017")
+    self.database_name = database_name
+    self.options = self.default_options() | options
+    self._client: pymongo.MongoClient|None = None
+    self._pid: int|None = None
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def default_options() -> dict[str, Any]:
+    env = lambda key, default: int(os.environ.get(key, default))
+    return {
+      "maxPoolSize": env("mongodb_max_pool_size", 50),
+      "minPoolSize": env("mongodb_min_pool_size", 0),
+      "maxIdleTimeMS": env("mongodb_max_idle_time_ms", 300000),
+      "connectTimeoutMS": env("mongodb_connect_timeout_ms", 5000),
+      "serverSelectionTimeoutMS": env("mongodb_server_selection_timeout_ms", 5000),
+      "socketTimeoutMS": env("mongodb_socket_timeout_ms", 0) or None,
+    }
+
+  @property
+  def client(self) -> pymongo.MongoClient:
+    pid = os.getpid()
+    if self._client is None or self._pid != pid:
+      with self._lock:
+        if self._client is None or self._pid != pid:
+          # The client inherited from the parent process is dropped, not closed, as its sockets belong to the parent
+          self._client = pymongo.MongoClient(self.uri, connect=False, **self.options)
+          self._pid = pid
+          logger.debug("MongoClient has been created. %s", {"PID": pid, "Options": self.options, "ObjectID": id(self)})
+    return self._client
+
+  @property
+  def db(self) -> Database:
+    return self.client[self.database_name]
+
+  def __getitem__(self, collection_name: str) -> Collection:
+    return self.db[collection_name]
+
+  def close(self) -> None:
+    with self._lock:
+      if self._client is not None and self._pid == os.getpid():
+        self._client.close()
+      self._client, self._pid = None, None
+
+  def __getstate__(self) -> dict[str, Any]:
+    return {"uri": self.uri, "database_name": self.database_name, "options": self.options}
+
+  def __setstate__(self, state: dict[str, Any]) -> None:
+    self.uri = state["uri"]
+    self.database_name = state["database_name"]
+    self.options = state["options"]
+    self._client, self._pid = None, None
+    self._lock = threading.Lock()
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import pickle
+import inspect
+import sqlite3
+import logging
+import threading
+from functools import wraps
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("cache_dir", os.path.abspath(os.path.join(SCRIPT_DIR, "../cache")))
+
+MISSING = object()
+# Raised when the cache file can not be created, opened or written
+CACHE_ERRORS = (sqlite3.Error, OSError)
+
+class LRUCache:
+  """In-process tier. Evicts the least recently used entries once the total pickled size exceeds `max_bytes`."""
+  __slots__ = ("max_bytes", "_entries", "_size", "_lock")
+  def __init__(self, max_bytes: int) -> None:
+    self.max_bytes = max_bytes
+    self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+    self._size = 0
+    self._lock = threading.Lock()
+
+  def get(self, key: Hashable) -> Any:
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return MISSING
+      self._entries.move_to_end(key)
+      return entry[0]
+
+  def set(self, key: Hashable, value: Any, size: int) -> None:
+    if size > self.max_bytes:
+      return
+    with self._lock:
+      if key in self._entries:
+        self._size -= self._entries.pop(key)[1]
+      self._entries[key] = (value, size)
+      self._size += size
+      while self._size > self.max_bytes:
+        self._size -= self._entries.popitem(last=False)[1][1]
+
+  def clear(self) -> None:
+    with self._lock:
+      self._entries.clear()
+      self._size = 0
+
+class DiskCache:
+  """Cross-worker tier stored in a local sqlite file. Also holds the data version shared by every process of the host."""
+  __slots__ = ("path", "max_bytes", "_local")
+  def __init__(self, path: str, max_bytes: int) -> None:
+    self.path = path
+    self.max_bytes = max_bytes
+    self._local = threading.local()
+
+  @property
+  def connection(self) -> sqlite3.Connection:
+    # sqlite connections can neither be shared between threads nor survive a fork
+    connection = getattr(self._local, "connection", None)
+    if connection is None or self._local.pid != os.getpid():
+      os.makedirs(os.path.dirname(self.path), exist_ok=True)
+      connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+      connection.execute("PRAGMA journal_mode=WAL")
+      connection.execute("PRAGMA synchronous=NORMAL")
+      connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, version INTEGER, value BLOB, size INTEGER, accessed REAL)")
+      connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+      self._local.connection, self._local.pid = connection, os.getpid()
+    return connection
+
+  def get(self, key: str, version: int) -> bytes | None:
+    row = self.connection.execute("SELECT value FROM entries WHERE key = ? AND version = ?", (key, version)).fetchone()
+    if row is None:
+      return None
+    self.connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+    return row[0]
+
+  def set(self, key: str, version: int, value: bytes) -> None:
+    if len(value) > self.max_bytes:
+      return
+    connection = self.connection
+    connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", (key, version, value, len(value), time.time()))
+    # Entries of older data versions go first, then the least recently accessed ones
+    connection.execute("DELETE FROM entries WHERE version < ?", (version, ))
+    total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total > self.max_bytes:
+      connection.execute(
+        "DELETE FROM entries WHERE key IN (SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed DESC) AS running FROM entries) WHERE running > ?)",
+        (self.max_bytes, )
+      )
+
+  def data_version(self) -> int:
+    row = self.connection.execute("SELECT value FROM meta WHERE name = 'DataVersion'").fetchone()
+    return row[0] if row is not None else 0
+
+  def bump_data_version(self) -> int:
+    connection = self.connection
+    connection.execute("INSERT INTO meta VALUES ('DataVersion', 1) ON CONFLICT(name) DO UPDATE SET value = value + 1")
+    return self.data_version()
+
+class QueryCache:
+  """Two tier result cache in front of Puller queries, invalidated by the data version bumped after every write.
+  While the cache file is unusable, queries run uncached and the data version is counted by this process only."""
+  __slots__ = ("memory", "disk", "available", "_local_version", "_lock")
+  def __init__(self, memory_bytes: int|None=None, disk_bytes: int|None=None, path: str|None=None) -> None:
+    self.memory = LRUCache(memory_bytes or int(os.environ.get("cache_memory_bytes", 256 * 2**20)))
+    self.disk = DiskCache(path or os.path.join(CACHE_DIR, "queries.sqlite3"), disk_bytes or int(os.environ.get("cache_disk_bytes", 2 * 2**30)))
+    self.available = True
+    self._local_version = -1 # Counts down, so that it never equals a shared version
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def make_key(name: str, arguments: dict[str, Any]) -> str:
+    """Builds the key of a query from its arguments bound by name, defaults included.
+    List and set values of an argument are treated as sets of values, so ["B", "A"] and ["A", "B"] share an entry."""
+    def normalize(value: Any) -> Any:
+      if isinstance(value, (list, set, frozenset)):
+        return sorted({json.dumps(normalize(item), sort_keys=True, default=str) for item in value})
+      if isinstance(value, tuple):
+        return [normalize(item) for item in value]
+      if isinstance(value, dict):
+        return {str(key): normalize(item) for key, item in value.items()}
+      return value
+    return json.dumps([name, {key: normalize(value) for key, value in arguments.items()}], sort_keys=True, default=str)
+
+  def data_version(self) -> int:
+    try:
+      version = self.disk.data_version()
+    except CACHE_ERRORS:
+      self._set_available(False)
+      return self._local_version
+    self._set_available(True)
+    return version
+
+  def bump_data_version(self) -> int:
+    """Never raises, the write it follows has already succeeded."""
+    try:
+      version = self.disk.bump_data_version()
+    except CACHE_ERRORS:
+      self._set_available(False)
+      with self._lock:
+        self._local_version -= 1
+        version = self._local_version
+    self.memory.clear()
+    logger.info("Data version has been bumped to %s. %s", version, {"Shared": self.available, "ObjectID": id(self)})
+    return version
+
+  def _set_available(self, available: bool) -> None:
+    with self._lock:
+      if available == self.available:
+        return
+      self.available = available
+    # Shared and local versions are unrelated numbers, entries cached under either are dropped when switching
+    self.memory.clear()
+    if available:
+      logger.info("Query cache is available again. %s", {"Path": self.disk.path, "ObjectID": id(self)})
+    else:
+      logger.warning("Query cache is unavailable, queries run uncached and data versions are local to the process. %s", {"Path": self.disk.path, "ObjectID": id(self)}, exc_info=True)
+
+  def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+    version = self.data_version()
+    if not self.available:
+      return compute()
+    value = self.memory.get((key, version))
+    if value is not MISSING:
+      return value
+    try:
+      blob = self.disk.get(key, version)
+    except CACHE_ERRORS:
+      logger.warning("Failed to read the query cache. %s", {"Key": key, "ObjectID": id(self)}, exc_info=True)
+      blob = None
+    if blob is not None:
+      value = pickle.loads(blob)
+    else:
+      value = compute()
+      blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+      try:
+        self.disk.set(key, version, blob)
+      except CACHE_ERRORS:
+        logger.warning("Failed to write the query cache. %s", {"Key": key, "ObjectID": id(self)}, exc_info=True)
+    self.memory.set((key, version), value, len(blob))
+    return value
+
+def cached(method: Callable) -> Callable:
+  """Serves the method from the `cache` attribute of its instance. Results must be treated as read only by callers."""
+  signature = inspect.signature(method)
+  @wraps(method)
+  def wrapper(self, *args, **kwargs):
+    # Binding keeps positional arguments apart and gives f(a) and f(a, default) the same key
+    bound = signature.bind(self, *args, **kwargs)
+    bound.apply_defaults()
+    arguments = dict(bound.arguments)
+    arguments.pop("self")
+    return self.cache.get_or_compute(QueryCache.make_key(method.__qualname__, arguments), lambda: method(self, *args, **kwargs))
+  return wrapper
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+from typing import Any, NamedTuple
+
+# Columns whose values repeat on many events, stored as integer codes into a list of categories
+CATEGORICAL_COLUMNS = ("Order_id", "MarketplaceName", "SKU", "ShipmentType")
+VARIANT_PREFIX = "Variant."
+
+class SalesFacets(NamedTuple):
+  """Values the filters of a dataset offer, computed once when the dataset is built."""
+  marketplaces: list[str]
+  variants: dict[str, list[Any]] # Variant dimension -> values
+  first_date: pd.Timestamp|None
+  last_date: pd.Timestamp|None
+
+class SalesFrame:
+  """Columnar sales events. Repeated strings are categorical codes, dates are datetime64[ms] and quantities are int16 when they fit.
+  Pickles as a few numpy buffers and converts to pandas without copying them."""
+  __slots__ = ("codes", "categories", "dates", "quantities", "facets")
+  def __init__(self, codes: dict[str, np.ndarray], categories: dict[str, list[Any]], dates: np.ndarray, quantities: np.ndarray) -> None:
+    self.codes = codes
+    self.categories = categories
+    self.dates = dates
+    self.quantities = quantities
+    self.facets = SalesFacets(
+      marketplaces=self.observed("MarketplaceName"),
+      variants={name[len(VARIANT_PREFIX):]: self.observed(name) for name in codes if name.startswith(VARIANT_PREFIX)},
+      first_date=pd.Timestamp(dates.min()) if len(dates) else None,
+      last_date=pd.Timestamp(dates.max()) if len(dates) else None
+    )
+
+  def observed(self, name: str) -> list[Any]:
+    """Sorted categories of the column that at least one event has."""
+    categories = self.categories[name]
+    counts = np.bincount(self.codes[name][self.codes[name] >= 0], minlength=len(categories))
+    return sorted((categories[code] for code in np.flatnonzero(counts)), key=str)
+
+  def __len__(self) -> int:
+    return len(self.dates)
+
+  @property
+  def columns(self) -> list[str]:
+    return ["PostedDate", "QuantityShipped", *self.codes]
+
+  @property
+  def nbytes(self) -> int:
+    return self.dates.nbytes + self.quantities.nbytes + sum(codes.nbytes for codes in self.codes.values()) + sum(64 * len(values) for values in self.categories.values())
+
+  def to_pandas(self) -> pd.DataFrame:
+    """Column names match the flattened event rows the frame replaces. Frames share the buffers, so they must be treated as read only."""
+    columns: dict[str, Any] = {
+      name: pd.Categorical.from_codes(codes, categories=pd.Index(self.categories[name], dtype=object), validate=False)
+      for name, codes in self.codes.items()
+    }
+    columns["PostedDate"] = pd.DatetimeIndex(self.dates, name="PostedDate")
+    columns["QuantityShipped"] = self.quantities
+    return pd.DataFrame(columns, copy=False)
+
+class SalesFrameBuilder:
+  """Collects the columns of sales events while a cursor is streamed. Categories are factorized once, when the frame is built."""
+  __slots__ = ("_columns", "_shipment_types")
+  def __init__(self) -> None:
+    self._columns: dict[str, list[Any]] = {name: [] for name in ("Order_id", "MarketplaceName", "SKU", "PostedDate", "QuantityShipped")}
+    self._shipment_types: list[tuple[str, int]] = []
+
+  def __len__(self) -> int:
+    return len(self._columns["PostedDate"])
+
+  def extend(self, columns: dict[str, list[Any]], shipment_type: str) -> None:
+    """Appends events given as equally long value lists per column, PostedDate being milliseconds since the epoch."""
+    for name, values in self._columns.items():
+      values.extend(columns[name])
+    self._shipment_types.append((shipment_type, len(columns["PostedDate"])))
+
+  def build(self, variants: dict[str, dict[str, Any]]) -> SalesFrame:
+    """Builds the frame, taking the Variant.* columns of every event from the variants of its SKU.
+    Events of SKUs without a product are left out."""
+    codes: dict[str, np.ndarray] = {}
+    categories: dict[str, list[Any]] = {}
+    for name in ("Order_id", "MarketplaceName", "SKU"):
+      codes[name], categories[name] = self._factorize(self._columns[name])
+    shipment_types = list(dict.fromkeys(shipment_type for shipment_type, _ in self._shipment_types))
+    codes["ShipmentType"] = np.repeat(
+      np.array([shipment_types.index(shipment_type) for shipment_type, _ in self._shipment_types], dtype="int32"),
+      [count for _, count in self._shipment_types]
+    )
+    categories["ShipmentType"] = shipment_types
+
+    # Variants only depend on the SKU, so they are resolved once per SKU and broadcast with its codes
+    skus = categories["SKU"]
+    keys = list(dict.fromkeys(key for sku in skus for key in (variants.get(sku) or {})))
+    for key in keys:
+      sku_codes, categories[VARIANT_PREFIX + key] = self._factorize([(variants.get(sku) or {}).get(key) for sku in skus] + [None])
+      codes[VARIANT_PREFIX + key] = sku_codes[codes["SKU"]] # Code -1 of missing SKUs picks the trailing None
+    dates = np.array(self._columns["PostedDate"], dtype="int64").view("datetime64[ms]")
+    quantities = np.array(self._columns["QuantityShipped"], dtype="int64")
+    # Daily sums of the rollup may not fit the int16 of single events
+    quantities = quantities.astype("int16" if not len(quantities) or np.abs(quantities).max() <= np.iinfo("int16").max else "int32")
+
+    has_product = np.array([sku in variants for sku in skus] + [False])[codes["SKU"]]
+    if not has_product.all():
+      codes = {name: values[has_product] for name, values in codes.items()}
+      dates, quantities = dates[has_product], quantities[has_product]
+    return SalesFrame(codes, categories, dates, quantities)
+
+  @staticmethod
+  def _factorize(values: list[Any]) -> tuple[np.ndarray, list[Any]]:
+    codes, uniques = pd.factorize(np.array(values, dtype=object))
+    return codes.astype("int32"), list(uniques)
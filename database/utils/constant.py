@@ -1,4 +1,5 @@
 from enum import StrEnum
+from typing import Any
 
 class OrderKey(StrEnum):
   _id = "_id"
@@ -100,4 +101,52 @@ class OFinancesKey(StrEnum):
   TaxWithholdingEventList = "TaxWithholdingEventList"
   TrialShipmentEventList = "TrialShipmentEventList"
   ValueAddedServiceChargeEventList = "ValueAddedServiceChargeEventList"
-  UpdatedAt = "UpdatedAt"
\ No newline at end of file
+  UpdatedAt = "UpdatedAt"
+
+class FieldType(StrEnum):
+  Date = "Date"
+  Decimal = "Decimal"
+  Integer = "Integer"
+
+class JobState(StrEnum):
+  Running = "Running"
+  Succeeded = "Succeeded"
+  Failed = "Failed"
+
+# ----- Normalization Schemas -----
+# Only the fields listed here are converted. A dict describes a nested document, a one element list describes a list of documents.
+Money = {"Amount": FieldType.Decimal}
+
+OrderSchema: dict[str, Any] = {
+  OrderKey.EarliestDeliveryDate: FieldType.Date,
+  OrderKey.LatestDeliveryDate: FieldType.Date,
+  OrderKey.EarliestShipDate: FieldType.Date,
+  OrderKey.LatestShipDate: FieldType.Date,
+  OrderKey.LastUpdateDate: FieldType.Date,
+  OrderKey.PurchaseDate: FieldType.Date,
+  OrderKey.NumberOfItemsShipped: FieldType.Integer,
+  OrderKey.NumberOfItemsUnshipped: FieldType.Integer,
+  OrderKey.OrderTotal: Money,
+}
+
+OItemSchema: dict[str, Any] = {
+  OItemKey.QuantityOrdered: FieldType.Integer,
+  OItemKey.QuantityShipped: FieldType.Integer,
+  OItemKey.ItemPrice: Money,
+  OItemKey.ItemTax: Money,
+  OItemKey.PromotionDiscount: Money,
+  OItemKey.PromotionDiscountTax: Money,
+  OItemKey.ShippingPrice: Money,
+  OItemKey.ShippingTax: Money,
+  OItemKey.ShippingDiscount: Money,
+  OItemKey.ShippingDiscountTax: Money,
+  OItemKey.BuyerInfo: {"GiftWrapPrice": Money, "GiftWrapTax": Money},
+}
+
+OrderItemsSchema: dict[str, Any] = {"OrderItems": [OItemSchema]}
+
+# Every financial event carries a PostedDate, shipment and refund events also list their items
+OFinancesSchema: dict[str, Any] = {key: [{"PostedDate": FieldType.Date}] for key in OFinancesKey if key not in (OFinancesKey._id, OFinancesKey.UpdatedAt)} | {
+  OFinancesKey.ShipmentEventList: [{"PostedDate": FieldType.Date, "ShipmentItemList": [{"QuantityShipped": FieldType.Integer}]}],
+  OFinancesKey.RefundEventList: [{"PostedDate": FieldType.Date, "ShipmentItemAdjustmentList": [{"QuantityShipped": FieldType.Integer}]}],
+}
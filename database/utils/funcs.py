@@ -1,4 +1,9 @@
-from collections.abc import MutableMapping
+from collections.abc import MutableMapping, Iterable, Generator
+from queue import Queue
+from threading import Thread, Event
+from typing import TypeVar
+
+T = TypeVar("T")
 
 def _flatten_dict_gen(d, parent_key, sep):
   for k, v in d.items():
@@ -10,4 +15,33 @@ def _flatten_dict_gen(d, parent_key, sep):
 
 
 def flatten_dict(d: MutableMapping, parent_key: str = '', sep: str = '.'):
-  return dict(_flatten_dict_gen(d, parent_key, sep))
\ No newline at end of file
+  return dict(_flatten_dict_gen(d, parent_key, sep))
+
+def prefetch(iterable: Iterable[T], depth: int = 1) -> Generator[T, None, None]:
+  """Yields the items of the iterable while a background thread already produces the next `depth` items."""
+  buffer: Queue = Queue(maxsize=depth)
+  done = object()
+  stop = Event()
+  def produce():
+    try:
+      for item in iterable:
+        buffer.put((item, None))
+        if stop.is_set():
+          return
+    except BaseException as e:
+      buffer.put((None, e))
+    else:
+      buffer.put((done, None))
+  Thread(target=produce, daemon=True).start()
+  try:
+    while True:
+      item, error = buffer.get()
+      if error is not None:
+        raise error
+      if item is done:
+        return
+      yield item
+  finally:
+    stop.set()
+    while not buffer.empty(): # Unblocks the producer if the consumer stopped early
+      buffer.get_nowait()
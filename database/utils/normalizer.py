@@ -0,0 +1,84 @@
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from .constant import FieldType, OrderSchema, OrderItemsSchema, OFinancesSchema
+from monitoring.metrics import NORMALIZE_SECONDS, NORMALIZED_DOCUMENTS
+
+Converter = Callable[[Any], Any]
+
+def _to_date(value: Any) -> Any:
+  if isinstance(value, str):
+    return datetime.fromisoformat(value).astimezone(timezone.utc)
+  return value
+
+def _to_decimal(value: Any) -> Any:
+  if isinstance(value, str):
+    return float(value) if value else None
+  return value
+
+def _to_integer(value: Any) -> Any:
+  if isinstance(value, str):
+    return int(value) if value else None
+  return value
+
+CONVERTERS: dict[FieldType, Converter] = {
+  FieldType.Date: _to_date,
+  FieldType.Decimal: _to_decimal,
+  FieldType.Integer: _to_integer,
+}
+
+def compile_schema(schema: dict[str, Any]) -> Callable[[dict[str, Any]], None]:
+  """Builds a function that converts, in place, only the fields of a document described by the schema."""
+  steps: list[Callable[[dict[str, Any]], None]] = []
+  for key, field in schema.items():
+    steps.append(_compile_field(str(key), field))
+  def normalize(document: dict[str, Any]) -> None:
+    for step in steps:
+      step(document)
+  return normalize
+
+def _compile_field(key: str, field: Any) -> Callable[[dict[str, Any]], None]:
+  if isinstance(field, FieldType):
+    convert = CONVERTERS[field]
+    def convert_value(document: dict[str, Any]) -> None:
+      value = document.get(key)
+      if value is not None:
+        document[key] = convert(value)
+    return convert_value
+  if isinstance(field, dict):
+    normalize = compile_schema(field)
+    def convert_document(document: dict[str, Any]) -> None:
+      value = document.get(key)
+      if isinstance(value, dict):
+        normalize(value)
+    return convert_document
+  if isinstance(field, list):
+    normalize = compile_schema(field[0])
+    def convert_documents(document: dict[str, Any]) -> None:
+      value = document.get(key)
+      if isinstance(value, list):
+        for item in value:
+          normalize(item)
+    return convert_documents
+  raise ValueError(f"Unsupported field definition for key '{key}': {field!r}")
+
+class Normalizer:
+  """Converts batches of API documents in place according to a compiled schema."""
+  __slots__ = ("name", "_normalize")
+  def __init__(self, name: str, schema: dict[str, Any]) -> None:
+    self.name = name # Label of the metrics of the normalizer
+    self._normalize = compile_schema(schema)
+
+  def __call__(self, documents: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    normalize = self._normalize
+    start = time.perf_counter()
+    for document in documents:
+      normalize(document)
+    NORMALIZE_SECONDS.observe(time.perf_counter() - start, schema=self.name)
+    NORMALIZED_DOCUMENTS.inc(len(documents), schema=self.name)
+    return documents
+
+normalize_orders = Normalizer("Orders", OrderSchema)
+normalize_order_items = Normalizer("OrderItems", OrderItemsSchema)
+normalize_order_finances = Normalizer("Finances", OFinancesSchema)
@@ -0,0 +1,164 @@
+import os
+import re
+import mmap
+import threading
+from typing import NamedTuple, Iterable
+
+from .logger import LOG_DIR
+
+# Record lines written with monitoring.logger.LOG_FORMAT, other lines continue the previous record (tracebacks)
+RECORD_START = re.compile(rb"^\[ (\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) \] - \d+ - [^\n]*? - \[ (DEBUG|INFO|WARNING|ERROR|CRITICAL) \]", re.M)
+RECORD = re.compile(r"^\[ (?P<time>[^\]]+) \] - (?P<thread>\d+) - (?P<filename>.*?) - (?P<function>.*?) - \[ (?P<level>\w+) \] - (?P<message>.*)", re.S)
+LOG_FILE = re.compile(r"^\d{4}-\d\d-\d\d\.log$")
+LEVELS = {"DEBUG": 1, "INFO": 2, "WARNING": 4, "ERROR": 8, "CRITICAL": 16}
+LEVEL_BITS = {level.encode(): bit for level, bit in LEVELS.items()}
+# Bytes of records summarized by one index entry, and bytes one read may scan before returning
+BLOCK_BYTES = 256 * 2**10
+SCAN_BYTES = 64 * 2**20
+
+class LogRecord(NamedTuple):
+  offset: int
+  time: str
+  thread: str
+  filename: str
+  function: str
+  level: str
+  message: str
+
+class LogPage(NamedTuple):
+  records: list[LogRecord] # In reading order, newest first when reading older records
+  cursor: int # Offset to continue reading from in the same direction
+  exhausted: bool # No records are left in that direction
+
+class LogBlock(NamedTuple):
+  offset: int
+  end: int
+  first_time: str
+  last_time: str
+  levels: int # Bitmask of the levels of the records of the block
+  records: int
+
+class LogIndex:
+  """Sparse index of one log file: a summary per block of about BLOCK_BYTES of records, with their time range and levels.
+  Reads only load the blocks they need and skip the ones whose levels or times can not match.
+  Refreshing only scans the bytes appended since the last refresh."""
+  __slots__ = ("path", "size", "blocks", "_lock")
+  def __init__(self, path: str) -> None:
+    self.path = path
+    self.size = 0
+    self.blocks: list[LogBlock] = []
+    self._lock = threading.Lock()
+
+  @property
+  def records(self) -> int:
+    return sum(block.records for block in self.blocks)
+
+  def refresh(self) -> None:
+    with self._lock:
+      size = os.path.getsize(self.path)
+      if size < self.size: # Truncated or replaced
+        self.size, self.blocks = 0, []
+      if size == self.size:
+        return
+      with open(self.path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        # Only complete lines are indexed, a line being written is picked up by the next refresh
+        end = data.rfind(b"\n", self.size, size) + 1
+        if end <= self.size:
+          return
+        # The last block stays open until it reaches BLOCK_BYTES, its summary is extended with the appended records only
+        block_offset, first_time, last_time, levels, records = None, "", b"", 0, 0
+        if self.blocks and self.blocks[-1].end - self.blocks[-1].offset < BLOCK_BYTES:
+          block_offset, _, first_time, last_time, levels, records = self.blocks.pop() # type: ignore
+          last_time = last_time.encode() # type: ignore
+        for match in RECORD_START.finditer(data, self.size, end):
+          offset = match.start()
+          if block_offset is not None and offset - block_offset >= BLOCK_BYTES:
+            self.blocks.append(LogBlock(block_offset, offset, first_time, last_time.decode(), levels, records)) # type: ignore
+            block_offset = None
+          if block_offset is None:
+            block_offset, first_time, levels, records = offset, match.group(1).decode(), 0, 0
+          last_time = match.group(1)
+          levels |= LEVEL_BITS[match.group(2)]
+          records += 1
+        if block_offset is not None:
+          self.blocks.append(LogBlock(block_offset, end, first_time, last_time.decode(), levels, records)) # type: ignore
+        elif self.blocks:
+          self.blocks[-1] = self.blocks[-1]._replace(end=end)
+        self.size = end
+
+  def read(self, before: int|None=None, after: int|None=None, limit: int=200, levels: Iterable[str]|None=None, search: str|None=None,
+           start: str|None=None, end: str|None=None, max_bytes: int=SCAN_BYTES) -> LogPage:
+    """Reads up to `limit` matching records older than offset `before` (newest first), or newer than offset `after` (oldest first).
+    Stops after scanning `max_bytes`, the cursor of the page then continues the scan."""
+    mask = sum(LEVELS.get(level, 0) for level in levels) if levels else sum(LEVELS.values())
+    search = search.lower() if search else None
+    reverse = after is None
+    with self._lock:
+      size, blocks = self.size, list(self.blocks)
+    bound = (size if before is None else before) if reverse else after
+    blocks = [block for block in blocks if (block.offset < bound if reverse else block.end > bound + 1)]
+    blocks = blocks[::-1] if reverse else blocks
+    records: list[LogRecord] = []
+    scanned, cursor = 0, bound
+    with open(self.path, "rb") as file:
+      for block in blocks:
+        if scanned >= max_bytes:
+          return LogPage(records, cursor, False)
+        # Blocks without a matching level or outside of the time range are never read
+        if not block.levels & mask or (start is not None and block.last_time < start) or (end is not None and block.first_time > end):
+          cursor = block.offset if reverse else block.end - 1
+          continue
+        # Only the part of the block past the bound is loaded, a tail read only loads the appended bytes
+        begin, finish = (block.offset, min(block.end, bound)) if reverse else (max(block.offset, bound), block.end)
+        file.seek(begin)
+        data = file.read(finish - begin)
+        scanned += len(data)
+        block_records = self._parse(data, begin)
+        for record in (reversed(block_records) if reverse else block_records):
+          if (record.offset >= bound) if reverse else (record.offset <= bound):
+            continue
+          cursor = record.offset
+          if not LEVELS.get(record.level, 0) & mask or (start is not None and record.time < start) or (end is not None and record.time > end):
+            continue
+          if search is not None and search not in record.message.lower():
+            continue
+          records.append(record)
+          if len(records) == limit:
+            return LogPage(records, cursor, False)
+    return LogPage(records, cursor, True)
+
+  @staticmethod
+  def _parse(data: bytes, base: int) -> list[LogRecord]:
+    starts = [match.start() for match in RECORD_START.finditer(data)] + [len(data)]
+    records = []
+    for begin, finish in zip(starts, starts[1:]):
+      match = RECORD.match(data[begin:finish].decode("utf-8", errors="replace").rstrip("\n"))
+      if match is not None:
+        records.append(LogRecord(offset=base + begin, **match.groupdict()))
+    return records
+
+class LogReader:
+  """Serves the log files of a directory through one lazily built and incrementally refreshed index per file."""
+  __slots__ = ("log_dir", "_indexes", "_lock")
+  def __init__(self, log_dir: str|None=None) -> None:
+    self.log_dir = log_dir or LOG_DIR
+    self._indexes: dict[str, LogIndex] = {}
+    self._lock = threading.Lock()
+
+  def files(self) -> list[dict[str, int|str]]:
+    """Log files, newest first."""
+    if not os.path.isdir(self.log_dir):
+      return []
+    names = sorted((name for name in os.listdir(self.log_dir) if LOG_FILE.match(name)), reverse=True)
+    return [{"name": name, "size": os.path.getsize(os.path.join(self.log_dir, name))} for name in names]
+
+  def get_index(self, name: str) -> LogIndex:
+    """Returns the refreshed index of the log file. Names other than log file names are rejected."""
+    if not LOG_FILE.match(name):
+      raise ValueError(f"Not a log file: {name}")
+    with self._lock:
+      index = self._indexes.get(name)
+      if index is None:
+        index = self._indexes[name] = LogIndex(os.path.join(self.log_dir, name))
+    index.refresh()
+    return index
@@ -0,0 +1,102 @@
+import os
+import copy
+import atexit
+import logging
+import threading
+from queue import SimpleQueue
+from datetime import date
+from logging.handlers import QueueHandler, QueueListener
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.environ.get("log_dir", os.path.abspath(os.path.join(SCRIPT_DIR, "../logs")))
+LOG_FORMAT = "[ %(asctime)s ] - %(thread)d - %(filename)s - %(funcName)s - [ %(levelname)s ] - %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Passed as `extra` by messages logged once per order or request, which the sampling filter thins out
+SAMPLED = {"sampled": True}
+
+class DailyFileHandler(logging.FileHandler):
+  """Writes into `<log_dir>/YYYY-MM-DD.log`, switching to the file of the new day after midnight."""
+  def __init__(self, log_dir: str) -> None:
+    self.log_dir = log_dir
+    self.day = date.today()
+    os.makedirs(log_dir, exist_ok=True)
+    super().__init__(self.get_path(self.day), encoding="utf-8", delay=True)
+
+  def get_path(self, day: date) -> str:
+    return os.path.join(self.log_dir, f"{day}.log")
+
+  def emit(self, record: logging.LogRecord) -> None:
+    today = date.today()
+    if today != self.day:
+      self.close()
+      self.day, self.baseFilename = today, self.get_path(today)
+    super().emit(record)
+
+class DeferredQueueHandler(QueueHandler):
+  """Only merges the arguments into the message on the calling thread, timestamps and tracebacks are formatted by the listener."""
+  def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+    record = copy.copy(record)
+    record.msg, record.args = record.getMessage(), None
+    return record
+
+class SamplingFilter(logging.Filter):
+  """Keeps one in `every` sampled records below WARNING. Other records always pass."""
+  def __init__(self, every: int) -> None:
+    super().__init__()
+    self.every = max(every, 1)
+    self._count = 0
+    self._lock = threading.Lock()
+
+  def filter(self, record: logging.LogRecord) -> bool:
+    if self.every == 1 or not getattr(record, "sampled", False) or record.levelno >= logging.WARNING:
+      return True
+    with self._lock:
+      self._count += 1
+      return self._count % self.every == 1
+
+def parse_levels(value: str) -> dict[str, str]:
+  """Parses 'database.amazon.api=WARNING,database.dBManager=DEBUG' into logger name -> level."""
+  levels = {}
+  for item in value.split(","):
+    name, _, level = item.partition("=")
+    if name.strip() and level.strip():
+      levels[name.strip()] = level.strip().upper()
+  return levels
+
+_listener: QueueListener|None = None
+_lock = threading.Lock()
+
+def setup_logging(log_dir: str|None=None, level: str|None=None, levels: dict[str, str]|None=None, sample_every: int|None=None) -> None:
+  """Routes every record of the process through a queue to a background thread writing the daily log file.
+  Callers only pay for putting the record on the queue. Messages use %-style arguments, so records discarded
+  by their level are never formatted. Levels and sampling come from env variables log_level, log_levels and log_sample_every."""
+  global _listener
+  with _lock:
+    if _listener is not None:
+      return
+    handler = DailyFileHandler(log_dir or LOG_DIR)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+    queue: SimpleQueue = SimpleQueue()
+    queue_handler = DeferredQueueHandler(queue)
+    # Sampled records are dropped before they are queued
+    queue_handler.addFilter(SamplingFilter(sample_every or int(os.environ.get("log_sample_every", 1))))
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+      root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level or os.environ.get("log_level", "INFO").upper())
+    for name, logger_level in (levels if levels is not None else parse_levels(os.environ.get("log_levels", ""))).items():
+      logging.getLogger(name).setLevel(logger_level)
+    _listener = QueueListener(queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+  """Writes the records still in the queue and stops the background thread."""
+  global _listener
+  with _lock:
+    if _listener is not None:
+      _listener.stop()
+      for handler in _listener.handlers:
+        handler.close()
+      _listener = None
@@ -0,0 +1,190 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Generator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PATH = os.environ.get("metrics_path", "/metrics")
+# Upper bounds in seconds, from a fast in-memory step to a throttled SP-API call
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+def _escape(value: Any) -> str:
+  return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str="") -> str:
+  pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + ([extra] if extra else [])
+  return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value: float) -> str:
+  return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric:
+  """Base of the metrics of a registry. Samples are kept per tuple of label values, in the order of `labels`."""
+  __slots__ = ("name", "help", "labels", "_values", "_lock")
+  type = ""
+  def __init__(self, name: str, help: str, labels: tuple[str, ...]=()) -> None:
+    self.name = name
+    self.help = help
+    self.labels = labels
+    self._values: dict[tuple[str, ...], Any] = {}
+    self._lock = threading.Lock()
+
+  def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+    if len(labels) != len(self.labels):
+      raise ValueError(f"Metric '{self.name}' expects labels {self.labels}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in self.labels)
+
+  def render(self) -> list[str]:
+    with self._lock:
+      values = {key: self._copy(value) for key, value in self._values.items()}
+    lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+    for key, value in sorted(values.items()):
+      lines.extend(self._render_sample(key, value))
+    return lines
+
+  @staticmethod
+  def _copy(value: Any) -> Any:
+    return value
+
+  def _render_sample(self, key: tuple[str, ...], value: Any) -> list[str]:
+    raise NotImplementedError
+
+class Counter(Metric):
+  __slots__ = ()
+  type = "counter"
+  def inc(self, value: float=1, **labels: Any) -> None:
+    key = self._key(labels)
+    with self._lock:
+      self._values[key] = self._values.get(key, 0) + value
+
+  def _render_sample(self, key: tuple[str, ...], value: float) -> list[str]:
+    return [f"{self.name}{_format_labels(self.labels, key)} {_format_number(value)}"]
+
+class Histogram(Metric):
+  """Cumulative buckets are only summed up when rendered, an observation increments a single bucket."""
+  __slots__ = ("buckets", )
+  type = "histogram"
+  def __init__(self, name: str, help: str, labels: tuple[str, ...]=(), buckets: tuple[float, ...]=LATENCY_BUCKETS) -> None:
+    super().__init__(name, help, labels)
+    self.buckets = tuple(sorted(buckets))
+
+  def observe(self, value: float, **labels: Any) -> None:
+    key = self._key(labels)
+    index = bisect.bisect_left(self.buckets, value)
+    with self._lock:
+      sample = self._values.get(key)
+      if sample is None:
+        sample = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+      sample[0][index] += 1
+      sample[1] += value
+
+  @contextmanager
+  def time(self, **labels: Any) -> Generator[None, None, None]:
+    """Observes the seconds spent in the block, also when it raises."""
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(time.perf_counter() - start, **labels)
+
+  @staticmethod
+  def _copy(value: list) -> list:
+    return [list(value[0]), value[1]]
+
+  def _render_sample(self, key: tuple[str, ...], value: list) -> list[str]:
+    counts, total = value
+    lines, cumulative = [], 0
+    for bound, count in zip((*self.buckets, float("inf")), counts):
+      cumulative += count
+      le = 'le="%s"' % ("+Inf" if bound == float("inf") else _format_number(bound))
+      lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+    lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_number(total)}")
+    lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+    return lines
+
+class Registry:
+  """Metrics of the process. Every process (Dash worker or scheduler) exposes its own, Prometheus sums them up."""
+  __slots__ = ("_metrics", "_lock")
+  def __init__(self) -> None:
+    self._metrics: dict[str, Metric] = {}
+    self._lock = threading.Lock()
+
+  def counter(self, name: str, help: str, labels: tuple[str, ...]=()) -> Counter:
+    return self._register(Counter(name, help, labels)) # type: ignore
+
+  def histogram(self, name: str, help: str, labels: tuple[str, ...]=(), buckets: tuple[float, ...]=LATENCY_BUCKETS) -> Histogram:
+    return self._register(Histogram(name, help, labels, buckets)) # type: ignore
+
+  def _register(self, metric: Metric) -> Metric:
+    with self._lock:
+      if metric.name in self._metrics:
+        raise ValueError(f"Metric '{metric.name}' is already registered")
+      self._metrics[metric.name] = metric
+    return metric
+
+  def render(self) -> str:
+    """Prometheus text exposition format."""
+    with self._lock:
+      metrics = list(self._metrics.values())
+    return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+REGISTRY = Registry()
+
+# ----- Stages -----
+SP_API_SECONDS = REGISTRY.histogram("sp_api_request_seconds", "SP-API call latency, throttle waits excluded.", ("operation", "outcome"))
+SP_API_THROTTLE_WAIT_SECONDS = REGISTRY.histogram("sp_api_throttle_wait_seconds", "Time spent waiting for a token of the rate limiter before a call.", ("operation", ))
+SP_API_BACKOFF_SECONDS = REGISTRY.histogram("sp_api_backoff_seconds", "Backoff slept after a throttled response.", ("operation", ))
+NORMALIZE_SECONDS = REGISTRY.histogram("normalize_seconds", "Dtype normalization time of a batch of API documents.", ("schema", ))
+NORMALIZED_DOCUMENTS = REGISTRY.counter("normalized_documents_total", "API documents normalized.", ("schema", ))
+BULK_WRITE_SECONDS = REGISTRY.histogram("bulk_write_seconds", "Duration of a bulk upsert, every chunk included.", ("collection", ))
+BULK_WRITE_DOCUMENTS = REGISTRY.counter("bulk_write_documents_total", "Documents passed to bulk upserts by result.", ("collection", "result"))
+AGGREGATION_SECONDS = REGISTRY.histogram("aggregation_seconds", "Database query time of Puller reads, cache hits excluded.", ("query", ))
+AGGREGATION_ROWS = REGISTRY.histogram("aggregation_rows", "Rows returned by Puller reads.", ("query", ), SIZE_BUCKETS)
+GRAPH_BUILD_SECONDS = REGISTRY.histogram("graph_build_seconds", "Graph build time by stage.", ("graph", "stage"))
+CALLBACK_SECONDS = REGISTRY.histogram("dash_callback_seconds", "End to end latency of Dash callback requests, serialization included.", ("output", "status"))
+
+def init_metrics(app: Any, path: str|None=None) -> None:
+  """Serves the registry on a route of the Flask server of the Dash app and times every callback request."""
+  from flask import Response, g, request
+  server = app.server
+  callback_path = app.config.requests_pathname_prefix + "_dash-update-component"
+
+  @server.before_request
+  def start_timer():
+    g.metrics_start = time.perf_counter()
+
+  @server.after_request
+  def observe_callback(response):
+    start = g.pop("metrics_start", None)
+    if start is not None and request.path == callback_path:
+      # The output spec of the callback, wildcards of pattern-matching ids included, keeps the label set bounded
+      output = (request.get_json(silent=True) or {}).get("output", "unknown")
+      CALLBACK_SECONDS.observe(time.perf_counter() - start, output=output, status=response.status_code)
+    return response
+
+  server.add_url_rule(path or METRICS_PATH, "metrics", lambda: Response(REGISTRY.render(), content_type=CONTENT_TYPE))
+
+class MetricsHandler(BaseHTTPRequestHandler):
+  def do_GET(self) -> None:
+    if self.path.split("?")[0] != METRICS_PATH:
+      self.send_error(404)
+      return
+    body = REGISTRY.render().encode()
+    self.send_response(200)
+    self.send_header("Content-Type", CONTENT_TYPE)
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format: str, *args: Any) -> None: # Scrapes are not logged
+    pass
+
+def serve_metrics(port: int, host: str="0.0.0.0") -> ThreadingHTTPServer:
+  """Serves the registry from a daemon thread, for processes without a Flask server such as the scheduler."""
+  server = ThreadingHTTPServer((host, port), MetricsHandler)
+  threading.Thread(target=server.serve_forever, name="metrics_server", daemon=True).start()
+  return server
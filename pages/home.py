@@ -7,6 +7,8 @@ dash.register_page(__name__, path="/")
 from components.graph import get_graph
 
 layout = html.Section(id="homepage-container", children=[
+  dcc.Interval(id="refresh-dropdown-options", interval=5000, n_intervals=0),
+  dcc.Store(id="product-options-version"),
   html.Div(id="content-container", children=[
     html.Div(id="all-graphs-container", children=[
       get_graph(uuid.uuid4()),
@@ -1,8 +1,32 @@
 import dash
+import dash_bootstrap_components as dbc
 from dash import dcc, html
 
+from monitoring.logReader import LEVELS
+
 dash.register_page(__name__)
 
 layout = html.Section(id="logpage-container", children=[
-  html.H1("Log Page")
-])
\ No newline at end of file
+  dcc.Interval(id="log-files-refresh", interval=30000, n_intervals=0),
+  dcc.Interval(id="log-tail", interval=2000, n_intervals=0, disabled=True),
+  dcc.Store(id="log-page"),
+  html.Div(id="log-filter-container", children=[
+    dcc.Dropdown(id="log-file", className="log-file", placeholder="Select a log file", clearable=False),
+    dbc.Checklist(
+      id="log-levels",
+      className="log-levels filter-checklist",
+      options=[{"label": level.capitalize(), "value": level} for level in LEVELS],
+      value=[level for level in LEVELS if level != "DEBUG"],
+      inline=True
+    ),
+    dbc.Input(id="log-search", className="log-search", type="search", placeholder="Search messages", debounce=True),
+    dbc.ButtonGroup(className="log-paging", children=[
+      dbc.Button(id="log-newer", outline=True, color="grey", children=html.I(className="fa-solid fa-chevron-left")),
+      dbc.Button(id="log-older", outline=True, color="grey", children=html.I(className="fa-solid fa-chevron-right")),
+    ]),
+    dbc.Switch(id="log-live", className="log-live", label="Live", value=False),
+  ]),
+  dcc.Loading(type="dot", children=[
+    html.Div(id="log-records", className="log-records")
+  ])
+])
@@ -0,0 +1,25 @@
+# ---------- SETUP ----------
+from monitoring.logger import setup_logging
+setup_logging()
+
+# ---------- IMPORTS ----------
+
+import os
+import signal
+
+from database.dBManager import DBManager
+from database.jobScheduler import Scheduler, get_jobs
+from monitoring.metrics import serve_metrics
+
+# Port the SP-API, normalization and bulk write metrics of the ingestion are served on, 0 to disable
+METRICS_PORT = int(os.environ.get("scheduler_metrics_port", 9108))
+
+# Ingestion runs in this process, started apart from app.py, so that it never competes with the dashboard's request threads
+if __name__ == "__main__":
+  if METRICS_PORT:
+    serve_metrics(METRICS_PORT)
+  db = DBManager()
+  scheduler = Scheduler(db, get_jobs(db))
+  signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+  signal.signal(signal.SIGINT, lambda signum, frame: scheduler.stop())
+  scheduler.run_forever()